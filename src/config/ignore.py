@@ -0,0 +1,173 @@
+"""
+Segment trie for gitignore-style ignore patterns.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one path segment of a glob into a regex fragment."""
+    parts = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            while i < n and segment[i] == "*":
+                i += 1
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            end = segment.find("]", i + 1 if i < n and segment[i] in "!^" else i)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = segment[i:end].replace("\\", "\\\\")
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end + 1
+        else:
+            parts.append(re.escape(c))
+    return "".join(parts)
+
+
+def _split_pattern(pattern: str) -> List[str]:
+    """Split a gitignore-style glob into path segments.
+    
+    A trailing "/" means everything inside the directory. As in gitignore,
+    a pattern with a leading or inner "/" is anchored to the root; any other
+    pattern (including "docs/") matches at any depth.
+    """
+    directory = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    segments = pattern.lstrip("/").split("/")
+    if not anchored:
+        segments = ["**"] + segments
+    if directory:
+        segments.append("**")
+    return segments
+
+
+class _Node:
+    """One trie state: the pattern segments matched so far."""
+    
+    __slots__ = ("literals", "globs", "any_glob", "star", "loop", "end", "rest")
+    
+    def __init__(self, loop: bool = False):
+        # Literal segment -> next state, looked up in one dict probe
+        self.literals: Dict[str, "_Node"] = {}
+        # (compiled segment glob, next state), tried in order
+        self.globs: List[Tuple[Pattern[str], "_Node"]] = []
+        # Union of the globs, so most segments are rejected in one regex call
+        self.any_glob: Optional[Pattern[str]] = None
+        # State entered by a "**" that is not the last segment
+        self.star: Optional["_Node"] = None
+        # True for "**" states, which stay active on any segment
+        self.loop = loop
+        # A pattern ends exactly here
+        self.end = False
+        # A pattern ends with "/**" here, matching anything below
+        self.rest = False
+
+
+class IgnoreTrie:
+    """Gitignore-style globs compiled into a trie keyed by path segment.
+    
+    Patterns sharing a prefix share states, so the common "**/name/**" form
+    collapses into one dict lookup per path segment, however many patterns
+    there are. "**" matches zero or more directories, a trailing "/**"
+    matches everything inside a directory, and "*"/"?" never cross "/".
+    """
+    
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._root = _Node()
+        self._glob_cache: Dict[str, Pattern[str]] = {}
+        for pattern in patterns:
+            self.add(pattern)
+    
+    def add(self, pattern: str) -> None:
+        """Insert one glob pattern."""
+        node = self._root
+        segments = _split_pattern(pattern)
+        last = len(segments) - 1
+        
+        for index, segment in enumerate(segments):
+            if segment == "**":
+                if index == last:
+                    node.rest = True
+                    return
+                if node.star is None:
+                    node.star = _Node(loop=True)
+                node = node.star
+            elif _GLOB_CHARS.isdisjoint(segment):
+                node = node.literals.setdefault(segment, _Node())
+            else:
+                node = self._glob_child(node, segment)
+        
+        node.end = True
+    
+    def _glob_child(self, node: _Node, segment: str) -> _Node:
+        """Return the state after node for a wildcard segment, creating it once."""
+        regex = self._glob_cache.get(segment)
+        if regex is None:
+            regex = re.compile(_translate_segment(segment) + r"\Z", re.DOTALL)
+            self._glob_cache[segment] = regex
+        
+        for existing, child in node.globs:
+            if existing is regex:
+                return child
+        
+        child = _Node()
+        node.globs.append((regex, child))
+        node.any_glob = re.compile(
+            "|".join(f"(?:{existing.pattern})" for existing, _ in node.globs),
+            re.DOTALL
+        )
+        return child
+    
+    def matches(self, path: str) -> bool:
+        """Check a "/"-separated relative path against all patterns at once.
+        
+        The set of live states advances one segment at a time, so the cost
+        grows with the path length rather than with the number of patterns.
+        """
+        active = self._follow(self._root, [])
+        
+        for segment in path.split("/"):
+            following: List[_Node] = []
+            for node in active:
+                # "/**" matches whatever remains, and at least this segment does
+                if node.rest:
+                    return True
+                
+                child = node.literals.get(segment)
+                if child is not None:
+                    self._follow(child, following)
+                if node.any_glob is not None and node.any_glob.match(segment):
+                    for regex, child in node.globs:
+                        if regex.match(segment):
+                            self._follow(child, following)
+                if node.loop:
+                    following.append(node)
+            
+            if not following:
+                return False
+            
+            # Several patterns can reach the same state; keep one of each
+            active = dict.fromkeys(following) if len(following) > 1 else following
+        
+        return any(node.end for node in active)
+    
+    @staticmethod
+    def _follow(node: _Node, states: List[_Node]) -> List[_Node]:
+        """Append node and the "**" states reachable from it without a segment."""
+        while node is not None:
+            states.append(node)
+            node = node.star
+        return states
@@ -2,13 +2,37 @@
 Settings and configuration management.
 """
 
+import copy
+import functools
 import os
+import re
+import stat
+import tempfile
 from pathlib import Path
-from typing import List, Optional
-from pydantic import BaseModel, Field
-import yaml
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+from pydantic import BaseModel, Field, PrivateAttr
 from loguru import logger
 
+from .ignore import IgnoreTrie
+
+# Validated config data per resolved file path, tagged with (mtime_ns, size)
+_validated_configs: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+
+# "**/name/**" or "**/name/": a literal directory name ignored at any depth
+_DIR_NAME_PATTERN_RE = re.compile(r"\*\*/([^/*?\[\]]+)/(?:\*\*)?\Z")
+
+
+def _match_path(trie: Optional[IgnoreTrie], path: str) -> bool:
+    """Match compiled ignore patterns against a "/"-separated relative path."""
+    if trie is None:
+        return False
+    if os.sep != "/":
+        path = path.replace(os.sep, "/")
+    if path.startswith("./"):
+        path = path[2:]
+    return trie.matches(path)
+
 
 class ServerConfig(BaseModel):
     """Server configuration."""
@@ -44,6 +68,44 @@ class RepositoryConfig(BaseModel):
         "**/Pipfile.lock",
         "**/poetry.lock"
     ])
+    _ignore_trie: Optional[IgnoreTrie] = PrivateAttr(default=None)
+    _ignored_dir_names: FrozenSet[str] = PrivateAttr(default=frozenset())
+    _dir_ignore_trie: Optional[IgnoreTrie] = PrivateAttr(default=None)
+    
+    def model_post_init(self, __context) -> None:
+        """Compile gitignore-style ignore patterns into a segment trie.
+        
+        Patterns that just name a directory at any depth ("**/node_modules/**")
+        are also collected into a set, so walkers can prune those directories
+        by name and only run the remaining patterns through a second trie.
+        """
+        self._ignore_trie = IgnoreTrie(self.ignore_patterns) if self.ignore_patterns else None
+        
+        dir_names = set()
+        residual = []
+        for pattern in self.ignore_patterns:
+            match = _DIR_NAME_PATTERN_RE.match(pattern)
+            if match:
+                dir_names.add(match.group(1))
+            else:
+                residual.append(pattern)
+        
+        self._ignored_dir_names = frozenset(dir_names)
+        self._dir_ignore_trie = IgnoreTrie(residual) if residual else None
+    
+    def is_ignored(self, path: str) -> bool:
+        """Check if a path matches any of the ignore patterns."""
+        return _match_path(self._ignore_trie, path)
+    
+    def is_dir_ignored(self, path: str, name: str) -> bool:
+        """Check if a directory should be pruned during a walk.
+        
+        Assumes the walk already pruned ignored ancestors, so only the directory
+        name and the patterns not covered by the name set need checking.
+        """
+        if name in self._ignored_dir_names:
+            return True
+        return _match_path(self._dir_ignore_trie, path + "/")
 
 
 class SearchConfig(BaseModel):
@@ -52,6 +114,8 @@ class SearchConfig(BaseModel):
     max_limit: int = 1000
     case_sensitive: bool = False
     include_binary: bool = False
+    use_ripgrep: bool = True
+    use_trigram_index: bool = False
     file_extensions: List[str] = Field(default_factory=lambda: [
         "*.py", "*.js", "*.ts", "*.jsx", "*.tsx", "*.java", "*.cpp", "*.c", "*.h",
         "*.go", "*.rs", "*.php", "*.rb", "*.swift", "*.kt", "*.scala", "*.r",
@@ -60,6 +124,15 @@ class SearchConfig(BaseModel):
         "*.json", "*.yaml", "*.yml", "*.toml", "*.ini", "*.cfg", "*.conf",
         "*.md", "*.rst", "*.txt", "*.log"
     ])
+    _ext_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+
+    def model_post_init(self, __context) -> None:
+        """Build the extension lookup set."""
+        self._ext_set = frozenset(ext.lstrip("*") for ext in self.file_extensions)
+
+    def is_extension_allowed(self, suffix: str) -> bool:
+        """Check if a file suffix (e.g. ".py") is in the allowed extensions."""
+        return suffix in self._ext_set
 
 
 class SemanticSearchConfig(BaseModel):
@@ -95,6 +168,26 @@ class Settings(BaseModel):
     semantic_search: SemanticSearchConfig = Field(default_factory=SemanticSearchConfig)
     todos: TodoConfig = Field(default_factory=TodoConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    _allowed_cache: Optional[Callable[[str], bool]] = PrivateAttr(default=None)
+    _is_ignored: Optional[Callable[[str], bool]] = PrivateAttr(default=None)
+    _ext_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+    
+    def model_post_init(self, __context) -> None:
+        """Set up the per-instance file filter cache."""
+        self._bind_filters()
+        self._allowed_cache = functools.lru_cache(maxsize=65536)(self._is_allowed_str)
+    
+    def _bind_filters(self) -> None:
+        """Bind the compiled filters locally so the hot path skips nested model lookups."""
+        self._is_ignored = self.repositories.is_ignored
+        self._ext_set = self.search._ext_set
+    
+    def clear_cache(self) -> None:
+        """Rebuild compiled filters and drop cached results after editing patterns."""
+        self.repositories.model_post_init(None)
+        self.search.model_post_init(None)
+        self._bind_filters()
+        self._allowed_cache.cache_clear()
     
     @classmethod
     def load_from_file(cls, config_path: str = "config/default.yaml") -> "Settings":
@@ -103,11 +196,25 @@ class Settings(BaseModel):
             config_file = Path(config_path)
             
             if config_file.exists():
+                cache_key = str(config_file.resolve())
+                stat_info = config_file.stat()
+                cached = _validated_configs.get(cache_key)
+                if cached is not None and cached[:2] == (stat_info.st_mtime_ns, stat_info.st_size):
+                    logger.info(f"Reloaded unchanged configuration from {config_path}")
+                    return cls.from_trusted_dict(cached[2])
+                
+                import yaml
+                
+                # Prefer the libyaml-backed loader when available
+                loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
                 with open(config_file, 'r', encoding='utf-8') as f:
-                    config_data = yaml.safe_load(f)
+                    config_data = yaml.load(f, Loader=loader)
+                
+                settings = cls(**config_data)
+                _validated_configs[cache_key] = (stat_info.st_mtime_ns, stat_info.st_size, settings.model_dump())
                 
                 logger.info(f"Loaded configuration from {config_path}")
-                return cls(**config_data)
+                return settings
             else:
                 logger.warning(f"Config file not found: {config_path}, using defaults")
                 return cls()
@@ -116,28 +223,46 @@ class Settings(BaseModel):
             logger.error(f"Error loading config: {e}, using defaults")
             return cls()
     
+    @classmethod
+    def from_trusted_dict(cls, data: Dict[str, Any]) -> "Settings":
+        """Build settings from already-validated data, skipping pydantic validation."""
+        data = copy.deepcopy(data)
+        sections = {
+            name: field.annotation.model_construct(**data[name])
+            for name, field in cls.model_fields.items()
+            if name in data
+        }
+        return cls.model_construct(**sections)
+    
     @classmethod
     def load_from_env(cls) -> "Settings":
         """Load settings from environment variables."""
         try:
-            # Load from environment variables
+            # Load from environment variables in a single pass
+            env = os.environ
             env_config = {}
             
             # Server config
-            if os.getenv("MCP_SERVER_NAME"):
-                env_config["server"] = {"name": os.getenv("MCP_SERVER_NAME")}
-            
-            if os.getenv("MCP_SERVER_VERSION"):
-                env_config["server"] = env_config.get("server", {})
-                env_config["server"]["version"] = os.getenv("MCP_SERVER_VERSION")
+            server = {
+                key: value
+                for key, value in (
+                    ("name", env.get("MCP_SERVER_NAME")),
+                    ("version", env.get("MCP_SERVER_VERSION")),
+                )
+                if value
+            }
+            if server:
+                env_config["server"] = server
             
             # Repository roots
-            if os.getenv("REPO_ROOT"):
-                env_config["repositories"] = {"roots": [os.getenv("REPO_ROOT")]}
+            repo_root = env.get("REPO_ROOT")
+            if repo_root:
+                env_config["repositories"] = {"roots": [repo_root]}
             
             # Logging level
-            if os.getenv("LOG_LEVEL"):
-                env_config["logging"] = {"level": os.getenv("LOG_LEVEL")}
+            log_level = env.get("LOG_LEVEL")
+            if log_level:
+                env_config["logging"] = {"level": log_level}
             
             if env_config:
                 logger.info("Loaded configuration from environment variables")
@@ -155,14 +280,55 @@ class Settings(BaseModel):
             config_file = Path(config_path)
             config_file.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(config_file, 'w', encoding='utf-8') as f:
-                yaml.dump(self.dict(), f, default_flow_style=False, indent=2)
+            import yaml
+            
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            data = self.model_dump(mode="json")
+            
+            # Write next to the target and swap it in atomically
+            fd, tmp_path = tempfile.mkstemp(
+                dir=config_file.parent, prefix=f".{config_file.name}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    yaml.dump(data, f, Dumper=dumper, default_flow_style=False, indent=2)
+                
+                # mkstemp creates the file 0600; keep the target's mode, or
+                # the one open() would give a new file
+                try:
+                    mode = stat.S_IMODE(os.stat(config_file).st_mode)
+                except FileNotFoundError:
+                    umask = os.umask(0)
+                    os.umask(umask)
+                    mode = 0o666 & ~umask
+                os.chmod(tmp_path, mode)
+                
+                os.replace(tmp_path, config_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
             
             logger.info(f"Saved configuration to {config_path}")
             
         except Exception as e:
             logger.error(f"Error saving config: {e}")
     
+    def _root_relative(self, path_str: str) -> str:
+        """Strip the repository root containing path_str, if any.
+        
+        Ignore patterns apply below the root, so a root's own location (e.g.
+        under a directory named "build") never matches them.
+        """
+        path = os.path.normpath(path_str)
+        for root in self.get_repository_roots():
+            root = os.path.normpath(root)
+            if root == ".":
+                if not os.path.isabs(path):
+                    return path
+            elif path.startswith(root.rstrip(os.sep) + os.sep):
+                return path[len(root.rstrip(os.sep)) + 1:]
+        return path_str
+    
     def get_repository_roots(self) -> List[str]:
         """Get repository roots, with fallback to current directory."""
         if self.repositories.roots:
@@ -170,19 +336,30 @@ class Settings(BaseModel):
         else:
             return ["."]
     
-    def is_file_allowed(self, file_path: str) -> bool:
+    def is_file_allowed(self, file_path: Union[str, os.PathLike]) -> bool:
         """Check if file is allowed based on configuration."""
-        file_path = Path(file_path)
-        
-        # Check ignore patterns
-        for pattern in self.repositories.ignore_patterns:
-            if file_path.match(pattern):
-                return False
+        path_str = file_path if isinstance(file_path, str) else os.fspath(file_path)
+        return self._allowed_cache(path_str)
+    
+    def _is_allowed_str(self, path_str: str) -> bool:
+        """Uncached file filter on a normalized path string."""
+        # Check ignore patterns, below the repository root holding the file
+        if self._is_ignored(self._root_relative(path_str)):
+            return False
         
         # Check file extensions
-        if file_path.suffix:
-            extension = f"*{file_path.suffix}"
-            if extension not in self.search.file_extensions:
-                return False
+        _, suffix = os.path.splitext(os.path.basename(path_str))
+        if len(suffix) > 1:
+            return suffix in self._ext_set
         
         return True
+
+
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the shared default Settings, built once per process.
+    
+    The instance is shared by every caller; code that edits settings should
+    build its own Settings() instead.
+    """
+    return Settings()
@@ -7,7 +7,6 @@ import re
 import os
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
-import chardet
 from loguru import logger
 
 from .search import SearchEngine
@@ -45,7 +44,7 @@ class CodeAnalyzer:
             )
             
             logger.info(f"Search completed: {len(results)} results for query '{query}'")
-            return results
+            return [hit.to_dict() for hit in results]
             
         except Exception as e:
             logger.error(f"Search error: {e}")
@@ -59,7 +58,7 @@ class CodeAnalyzer:
     ) -> Tuple[str, int]:
         """Read file contents with pagination."""
         try:
-            content, total_bytes = await self.file_utils.read_file(
+            content, total_bytes = await self.file_utils.aread_file(
                 path=path,
                 offset=offset,
                 length=length
@@ -82,10 +81,8 @@ class CodeAnalyzer:
         """Explain a range of code."""
         try:
             if code is None:
-                # Read the code from file
-                content, _ = await self.read_file(path)
-                lines = content.split('\n')
-                code = '\n'.join(lines[start_line-1:end_line])
+                # Read only the requested lines from file
+                code = await self.file_utils.read_lines(path, start_line, end_line)
             
             explanation = await self.explainer.explain(
                 code=code,
@@ -107,7 +104,7 @@ class CodeAnalyzer:
             todos = await self.search_engine.find_todos(path_prefix=path_prefix)
             
             logger.info(f"TODO search completed: {len(todos)} items found")
-            return todos
+            return [todo.to_dict() for todo in todos]
             
         except Exception as e:
             logger.error(f"List todos error: {e}")
@@ -2,11 +2,26 @@
 Code explanation engine using rule-based analysis.
 """
 
+import asyncio
+import hashlib
+import io
 import re
 import ast
-from typing import Dict, List, Any, Optional
+import textwrap
+import threading
+import tokenize
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Any, Optional, Set, Tuple
 from loguru import logger
 
+# Branch keywords counted for cyclomatic complexity
+_COMPLEXITY_RE = re.compile(r'\b(?:if|elif|else|for|while|try|except|and|or)\b', re.IGNORECASE)
+_DEF_RE = re.compile(r'def\s+\w+')
+_CLASS_RE = re.compile(r'class\s+\w+')
+
+# Number of explanations kept in the content-addressed result cache
+_EXPLAIN_CACHE_SIZE = 2048
+
 
 class CodeExplainer:
     """Rule-based code explanation engine."""
@@ -55,8 +70,50 @@ class CodeExplainer:
             "kotlin": ["fun ", "class ", "import ", "val ", "var "]
         }
         
+        # One lookahead alternation over every pattern and risk keyword,
+        # longest first, so each scan position reports its longest keyword.
+        # A keyword's hit sets include those of its keyword prefixes, since a
+        # prefix starting at the same position is present as well.
+        self._keyword_hits = self._build_keyword_hits(self.patterns, self.risk_patterns)
+        self._keyword_re = re.compile("(?=(" + "|".join(
+            re.escape(keyword) for keyword in sorted(self._keyword_hits, key=len, reverse=True)
+        ) + "))")
+        
+        # One lookahead alternation with a named group per language, so a
+        # single scan reports every position where some language keyword starts
+        self._language_rank = {language: rank for rank, language in enumerate(self.language_patterns)}
+        self._language_re = re.compile("(?=" + "|".join(
+            f"(?P<{language}>" + "|".join(re.escape(p.lower()) for p in patterns) + ")"
+            for language, patterns in self.language_patterns.items()
+        ) + ")")
+        
+        # Explanation results keyed by (content digest, path, start, end)
+        self._explain_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._explain_cache_lock = threading.Lock()
+        
         logger.info("CodeExplainer initialized")
     
+    @staticmethod
+    def _build_keyword_hits(
+        patterns: Dict[str, List[str]],
+        risk_patterns: Dict[str, List[str]]
+    ) -> Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]:
+        """Map each lowercased keyword to the (pattern, risk) categories it implies."""
+        owners: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        for index, keyword_map in enumerate((patterns, risk_patterns)):
+            for name, keywords in keyword_map.items():
+                for keyword in keywords:
+                    owners.setdefault(keyword.lower(), (set(), set()))[index].add(name)
+        
+        hits = {}
+        for keyword in owners:
+            prefixes = [other for other in owners if keyword.startswith(other)]
+            hits[keyword] = (
+                frozenset().union(*(owners[other][0] for other in prefixes)),
+                frozenset().union(*(owners[other][1] for other in prefixes)),
+            )
+        return hits
+    
     async def explain(
         self,
         code: str,
@@ -66,114 +123,168 @@ class CodeExplainer:
     ) -> Dict[str, Any]:
         """Explain code using rule-based analysis."""
         try:
-            # Detect language
-            language = self._detect_language(code)
-            
-            # Analyze patterns
-            detected_patterns = self._analyze_patterns(code)
-            
-            # Identify risks
-            risks = self._identify_risks(code)
-            
-            # Calculate complexity
-            complexity = self._calculate_complexity(code)
-            
-            # Generate suggestions
-            suggestions = self._generate_suggestions(code, risks, complexity)
-            
-            # Generate summary
-            summary = self._generate_summary(code, detected_patterns, language)
-            
-            explanation = {
-                "summary": summary,
-                "language": language,
-                "patterns": detected_patterns,
-                "risks": risks,
-                "complexity": complexity,
-                "suggestions": suggestions,
-                "metadata": {
-                    "path": path,
-                    "start_line": start_line,
-                    "end_line": end_line,
-                    "lines_of_code": len(code.split('\n'))
-                }
-            }
+            # Analysis is pure CPU work, keep it off the event loop
+            explanation = await asyncio.to_thread(
+                self._explain_cached, code, path, start_line, end_line
+            )
             
-            logger.info(f"Code explanation completed: {language} code with {len(detected_patterns)} patterns")
+            logger.info(
+                f"Code explanation completed: {explanation['language']} code "
+                f"with {len(explanation['patterns'])} patterns"
+            )
             return explanation
             
         except Exception as e:
             logger.error(f"Code explanation error: {e}")
             raise
     
-    def _detect_language(self, code: str) -> str:
-        """Detect programming language from code."""
-        code_lower = code.lower()
+    def _explain_cached(
+        self,
+        code: str,
+        path: str,
+        start_line: int,
+        end_line: int
+    ) -> Dict[str, Any]:
+        """Return a cached explanation for identical code, computing it on a miss.
+        
+        Cached dicts are shared between callers and must not be mutated.
+        """
+        digest = hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        key = (digest, path, start_line, end_line)
         
-        for language, patterns in self.language_patterns.items():
-            if any(pattern.lower() in code_lower for pattern in patterns):
-                return language
+        with self._explain_cache_lock:
+            explanation = self._explain_cache.get(key)
+            if explanation is not None:
+                self._explain_cache.move_to_end(key)
+                return explanation
         
-        return "unknown"
+        explanation = self._explain_sync(code, path, start_line, end_line)
+        
+        with self._explain_cache_lock:
+            self._explain_cache[key] = explanation
+            if len(self._explain_cache) > _EXPLAIN_CACHE_SIZE:
+                self._explain_cache.popitem(last=False)
+        
+        return explanation
     
-    def _analyze_patterns(self, code: str) -> List[str]:
-        """Analyze code patterns."""
-        detected_patterns = []
+    def _explain_sync(
+        self,
+        code: str,
+        path: str,
+        start_line: int,
+        end_line: int
+    ) -> Dict[str, Any]:
+        """Run the full rule-based analysis synchronously."""
+        # Lowercase and split once, shared by all analysis passes
         code_lower = code.lower()
+        lines = code.split('\n')
         
-        for pattern_name, keywords in self.patterns.items():
-            if any(keyword in code_lower for keyword in keywords):
-                detected_patterns.append(pattern_name)
+        # Detect language
+        language = self._detect_language(code_lower)
+        
+        # Collect every pattern/risk keyword present in one scan
+        keywords = {match.group(1) for match in self._keyword_re.finditer(code_lower)}
+        
+        # Analyze patterns
+        detected_patterns = self._analyze_patterns(keywords)
+        
+        # Identify risks
+        risks = self._identify_risks(keywords)
+        
+        # Calculate complexity
+        complexity = self._calculate_complexity(code, lines, language)
+        
+        # Generate suggestions
+        suggestions = self._generate_suggestions(code, risks, complexity)
+        
+        # Generate summary
+        summary = self._generate_summary(
+            code, lines, detected_patterns, language, complexity["function_count"]
+        )
+        
+        explanation = {
+            "summary": summary,
+            "language": language,
+            "patterns": detected_patterns,
+            "risks": risks,
+            "complexity": complexity,
+            "suggestions": suggestions,
+            "metadata": {
+                "path": path,
+                "start_line": start_line,
+                "end_line": end_line,
+                "lines_of_code": len(lines)
+            }
+        }
         
-        return detected_patterns
+        return explanation
     
-    def _identify_risks(self, code: str) -> List[str]:
-        """Identify potential risks in code."""
-        risks = []
-        code_lower = code.lower()
+    def _detect_language(self, code_lower: str) -> str:
+        """Detect programming language from lowercased code."""
+        # Languages earlier in language_patterns win, as with a first-hit loop
+        best = None
+        for match in self._language_re.finditer(code_lower):
+            language = match.lastgroup
+            if best is None or self._language_rank[language] < self._language_rank[best]:
+                best = language
+                if self._language_rank[best] == 0:
+                    break
+        
+        return best or "unknown"
+    
+    def _analyze_patterns(self, keywords: Set[str]) -> List[str]:
+        """Analyze code patterns from the keywords found in the code."""
+        found = set()
+        for keyword in keywords:
+            found |= self._keyword_hits[keyword][0]
         
-        for risk_type, patterns in self.risk_patterns.items():
-            if any(pattern in code_lower for pattern in patterns):
-                risks.append(risk_type)
+        return [pattern_name for pattern_name in self.patterns if pattern_name in found]
+    
+    def _identify_risks(self, keywords: Set[str]) -> List[str]:
+        """Identify potential risks from the keywords found in the code."""
+        found = set()
+        for keyword in keywords:
+            found |= self._keyword_hits[keyword][1]
         
-        return risks
+        return [risk_type for risk_type in self.risk_patterns if risk_type in found]
     
-    def _calculate_complexity(self, code: str) -> Dict[str, Any]:
+    def _calculate_complexity(self, code: str, lines: List[str], language: str = "unknown") -> Dict[str, Any]:
         """Calculate code complexity metrics."""
-        lines = code.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
-        
-        # Basic metrics
         total_lines = len(lines)
-        code_lines = len(non_empty_lines)
+        code_lines = 0
+        current_nesting = 0
         
-        # Cyclomatic complexity (simplified)
-        complexity_keywords = ['if', 'elif', 'else', 'for', 'while', 'try', 'except', 'and', 'or']
-        cyclomatic_complexity = 1  # Base complexity
+        # Cyclomatic complexity (simplified), one scan over the whole buffer
+        cyclomatic_complexity = 1 + len(_COMPLEXITY_RE.findall(code))
         
-        for line in lines:
-            for keyword in complexity_keywords:
-                if keyword in line.lower():
-                    cyclomatic_complexity += 1
-        
-        # Nesting depth
-        max_nesting = 0
-        current_nesting = 0
+        # Python nesting comes from the tokenizer; other code uses the line heuristic
+        python_nesting = self._python_nesting_depth(code) if language == "python" else None
+        use_heuristic = python_nesting is None
+        max_nesting = python_nesting or 0
         
+        # Single pass: line counts and nesting depth
         for line in lines:
             stripped = line.strip()
+            if not stripped:
+                continue
+            
+            code_lines += 1
+            
+            # Nesting depth
+            if not use_heuristic:
+                continue
             if stripped.startswith(('if ', 'for ', 'while ', 'try:', 'with ', 'def ', 'class ')):
                 current_nesting += 1
                 max_nesting = max(max_nesting, current_nesting)
             elif stripped.startswith(('else:', 'elif ', 'except:', 'finally:')):
                 # Same level
                 pass
-            elif stripped and not stripped.startswith('#'):
+            elif not stripped.startswith('#'):
                 # End of block
                 current_nesting = max(0, current_nesting - 1)
         
         # Function count
-        function_count = len(re.findall(r'def\s+\w+', code))
+        function_count = len(_DEF_RE.findall(code))
         
         return {
             "total_lines": total_lines,
@@ -184,6 +295,28 @@ class CodeExplainer:
             "complexity_score": self._calculate_complexity_score(cyclomatic_complexity, max_nesting, function_count)
         }
     
+    def _python_nesting_depth(self, code: str) -> Optional[int]:
+        """Measure maximum block nesting of Python code from INDENT/DEDENT tokens.
+        
+        Returns None when the snippet cannot be tokenized, e.g. a range that
+        cuts through a block.
+        """
+        depth = 0
+        max_depth = 0
+        
+        try:
+            readline = io.StringIO(textwrap.dedent(code)).readline
+            for token in tokenize.generate_tokens(readline):
+                if token.type == tokenize.INDENT:
+                    depth += 1
+                    max_depth = max(max_depth, depth)
+                elif token.type == tokenize.DEDENT:
+                    depth -= 1
+        except (tokenize.TokenError, SyntaxError):
+            return None
+        
+        return max_depth
+    
     def _calculate_complexity_score(self, cyclomatic: int, nesting: int, functions: int) -> str:
         """Calculate overall complexity score."""
         score = cyclomatic + nesting + functions
@@ -251,9 +384,15 @@ class CodeExplainer:
         
         return suggestions
     
-    def _generate_summary(self, code: str, patterns: List[str], language: str) -> str:
+    def _generate_summary(
+        self,
+        code: str,
+        lines: List[str],
+        patterns: List[str],
+        language: str,
+        function_count: int
+    ) -> str:
         """Generate code summary."""
-        lines = code.split('\n')
         line_count = len([line for line in lines if line.strip()])
         
         # Base summary
@@ -268,11 +407,10 @@ class CodeExplainer:
         
         # Add specific observations
         if "def " in code:
-            function_count = len(re.findall(r'def\s+\w+', code))
             summary_parts.append(f"with {function_count} function(s)")
         
         if "class " in code:
-            class_count = len(re.findall(r'class\s+\w+', code))
+            class_count = len(_CLASS_RE.findall(code))
             summary_parts.append(f"and {class_count} class(es)")
         
         if "import " in code:
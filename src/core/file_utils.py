@@ -2,13 +2,238 @@
 File utilities for code analysis.
 """
 
+import asyncio
+import functools
+import itertools
+import mmap
 import os
 import stat
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-import chardet
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple, Union
 from loguru import logger
 
+from .walk import walk_files
+
+
+# Batches smaller than this are stat'ed inline; larger ones are split into
+# chunks of this size and stat'ed on a shared thread pool
+_STAT_CHUNK_SIZE = 256
+_stat_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _stat_chunk(entries: List[os.DirEntry]) -> List[Optional[os.stat_result]]:
+    """Stat a chunk of directory entries, returning None for entries that fail."""
+    results = []
+    for entry in entries:
+        try:
+            results.append(entry.stat())
+        except OSError:
+            results.append(None)
+    return results
+
+
+def _is_visible(path: str) -> bool:
+    """Check that a file name does not start with a dot."""
+    return not os.path.basename(path).startswith('.')
+
+
+def stat_entries(entries: List[os.DirEntry]) -> List[Optional[os.stat_result]]:
+    """Stat many directory entries, overlapping the syscalls for large batches.
+    
+    The GIL is released during stat(), so chunks running on a small thread
+    pool keep several metadata lookups in flight on cold caches or network
+    filesystems. Results are returned in input order.
+    """
+    global _stat_pool
+    
+    if len(entries) <= _STAT_CHUNK_SIZE:
+        return _stat_chunk(entries)
+    
+    if _stat_pool is None:
+        _stat_pool = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="codecompass-stat"
+        )
+    
+    chunks = [entries[i:i + _STAT_CHUNK_SIZE] for i in range(0, len(entries), _STAT_CHUNK_SIZE)]
+    return [result for chunk in _stat_pool.map(_stat_chunk, chunks) for result in chunk]
+
+
+# Open flags for raw reads; O_BINARY only exists (and matters) on Windows
+_READ_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+# Linux-only: skip atime updates for files we merely scan. The kernel rejects
+# it with EPERM for files the process does not own, so open_readonly() retries.
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+_READ_CHUNK_SIZE = 8192 if os.name == "nt" else 4096
+
+# Files above this size are read in a worker thread by aread_file()
+_THREAD_READ_THRESHOLD = 1024 * 1024
+
+# Paginated reads of files above this size slice a memory map; smaller
+# files are read with a single positioned read
+_MMAP_READ_THRESHOLD = 64 * 1024
+
+# Most bytes mapped at once for a paginated read; larger windows are copied
+# out piece by piece, so address space use does not grow with the file
+_MMAP_WINDOW = 8 << 20
+
+# read_text() keeps up to _READ_CACHE_ENTRIES decoded files of at most
+# _READ_CACHE_MAX_FILE_SIZE bytes each, so the cache stays within 32 MiB of
+# source; larger files are decoded on every call
+_READ_CACHE_ENTRIES = 512
+_READ_CACHE_MAX_FILE_SIZE = 64 * 1024
+
+# Byte order marks, longest first so UTF-32 LE is not mistaken for UTF-16 LE
+_BOMS = (
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+)
+_BOM_PREFIXES = tuple(bom for bom, _ in _BOMS)
+
+# Suffixes whose sources are UTF-8 by convention (or by spec, e.g. JSON/TOML);
+# without a BOM they are decoded as UTF-8 with replacement, never via chardet.
+# C/C++, Java, PowerShell and plain text are left out as legacy encodings and
+# UTF-16 are still common there.
+_UTF8_SUFFIXES = frozenset({
+    '.py', '.pyi', '.js', '.mjs', '.cjs', '.ts', '.jsx', '.tsx', '.go', '.rs',
+    '.rb', '.php', '.swift', '.kt', '.scala', '.sh', '.bash', '.zsh', '.fish',
+    '.sql', '.html', '.css', '.scss', '.sass', '.less', '.json', '.yaml',
+    '.yml', '.toml', '.md', '.rst'
+})
+
+
+def open_readonly(path: str) -> int:
+    """Open a file descriptor for reading, without atime updates where allowed."""
+    if _O_NOATIME:
+        try:
+            return os.open(path, _READ_FLAGS | _O_NOATIME)
+        except PermissionError:
+            pass
+    return os.open(path, _READ_FLAGS)
+
+
+def _read_bytes(path: str) -> bytes:
+    """Read a whole file with os.open/os.read, sized from fstat."""
+    fd = open_readonly(path)
+    try:
+        size = os.fstat(fd).st_size
+        parts = []
+        while True:
+            chunk = os.read(fd, max(size, _READ_CHUNK_SIZE))
+            if not chunk:
+                break
+            parts.append(chunk)
+        return b"".join(parts)
+    finally:
+        os.close(fd)
+
+
+def _pread(fd: int, length: int, offset: int) -> bytes:
+    """Positioned read; seeks and reads where os.pread is unavailable."""
+    if hasattr(os, "pread"):
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
+
+
+def _read_window(path: str, offset: int, length: int) -> Tuple[bytes, bytes, int]:
+    """Read length bytes at offset without reading the rest of the file.
+    
+    Returns (head, window, total_bytes), where head holds the first bytes of
+    the file so a byte order mark can still be recognised.
+    """
+    fd = open_readonly(path)
+    try:
+        size = os.fstat(fd).st_size
+        head_size = len(_BOMS[0][0])
+        
+        # Clamp to the file so the read never allocates more than it returns
+        length = max(0, min(length, size - offset))
+        head = _pread(fd, head_size, 0)
+        
+        if size <= _MMAP_READ_THRESHOLD:
+            return head, _pread(fd, length, offset), size
+        
+        # Map only the window, from an allocation-granularity boundary, in
+        # pieces of at most _MMAP_WINDOW bytes
+        parts = []
+        pos = offset
+        end = offset + length
+        while pos < end:
+            aligned = pos - pos % mmap.ALLOCATIONGRANULARITY
+            map_length = min(end - aligned, _MMAP_WINDOW)
+            with mmap.mmap(fd, map_length, offset=aligned, access=mmap.ACCESS_READ) as mapped:
+                parts.append(mapped[pos - aligned:])
+            pos = aligned + map_length
+        
+        return head, b"".join(parts), size
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=4096)
+def _path(path: str) -> Path:
+    """Return a shared Path object for a path string.
+    
+    Path objects are immutable, so repeated reads of the same file reuse one
+    instance instead of re-parsing the string each call.
+    """
+    return Path(path)
+
+
+# Language by lower-cased file extension; read-only so it can be shared
+_LANGUAGE_MAP = MappingProxyType({
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.jsx': 'javascript',
+    '.tsx': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+    '.h': 'c',
+    '.hpp': 'cpp',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.php': 'php',
+    '.rb': 'ruby',
+    '.swift': 'swift',
+    '.kt': 'kotlin',
+    '.scala': 'scala',
+    '.r': 'r',
+    '.m': 'matlab',
+    '.sh': 'bash',
+    '.bash': 'bash',
+    '.zsh': 'zsh',
+    '.fish': 'fish',
+    '.ps1': 'powershell',
+    '.bat': 'batch',
+    '.cmd': 'batch',
+    '.sql': 'sql',
+    '.html': 'html',
+    '.css': 'css',
+    '.scss': 'scss',
+    '.sass': 'sass',
+    '.less': 'less',
+    '.xml': 'xml',
+    '.json': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.toml': 'toml',
+    '.ini': 'ini',
+    '.cfg': 'ini',
+    '.conf': 'ini',
+    '.md': 'markdown',
+    '.rst': 'restructuredtext',
+    '.txt': 'text',
+    '.log': 'log'
+})
+
 
 class FileUtils:
     """File utilities for code analysis."""
@@ -17,9 +242,12 @@ class FileUtils:
         self.settings = settings
         self.max_file_size = settings.server.max_file_size_mb * 1024 * 1024
         
+        # Decoded contents keyed by (path, mtime_ns, size), so edits invalidate entries
+        self._read_cached = functools.lru_cache(maxsize=_READ_CACHE_ENTRIES)(self._read_decoded)
+        
         logger.info("FileUtils initialized")
     
-    async def read_file(
+    def read_file(
         self,
         path: str,
         offset: int = 0,
@@ -27,55 +255,189 @@ class FileUtils:
     ) -> Tuple[str, int]:
         """Read file contents with pagination."""
         try:
-            file_path = Path(path)
-            
-            # Check if file exists
-            if not file_path.exists():
-                raise FileNotFoundError(f"File not found: {path}")
+            stat_info = self._check_readable(path)
             
-            # Check if it's a file
-            if not file_path.is_file():
-                raise ValueError(f"Path is not a file: {path}")
+            # Windows of UTF-8 sources are read alone; the encoding then only
+            # depends on the suffix and a possible byte order mark
+            utf8_source = os.path.splitext(path)[1].lower() in _UTF8_SUFFIXES
+            partial = offset > 0 or 0 <= length < stat_info.st_size
             
-            # Check file size
-            file_size = file_path.stat().st_size
-            if file_size > self.max_file_size:
-                raise ValueError(f"File too large: {file_size} bytes (max: {self.max_file_size})")
-            
-            # Read file with encoding detection
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
+            if partial and utf8_source and offset >= 0:
+                head, window, total_bytes = _read_window(path, offset, length)
+                encoding = self._detect_encoding(head, path)
+                content = self._decode_window(window, encoding)
+            else:
+                raw_data = _read_bytes(path)
+                total_bytes = len(raw_data)
+                
+                if offset > 0 or length < total_bytes:
+                    # Paginate in byte space and decode only the requested window
+                    encoding = self._detect_encoding(raw_data, path)
+                    with memoryview(raw_data) as view:
+                        content = self._decode_window(view[offset:offset + length], encoding)
+                else:
+                    # Detect encoding and decode content
+                    content, _ = self._decode(raw_data, path)
             
-            # Detect encoding
-            encoding = self._detect_encoding(raw_data)
+            logger.info(f"File read: {path} ({len(content)} chars, {total_bytes} bytes)")
+            return content, total_bytes
             
-            # Decode content
+        except Exception as e:
+            logger.error(f"Read file error: {e}")
+            raise
+    
+    async def aread_file(
+        self,
+        path: str,
+        offset: int = 0,
+        length: int = 2000
+    ) -> Tuple[str, int]:
+        """Async read_file; large files are read in a worker thread."""
+        try:
+            file_size = os.stat(path).st_size
+        except OSError:
+            file_size = 0
+        
+        if file_size > _THREAD_READ_THRESHOLD:
+            return await asyncio.to_thread(self.read_file, path, offset, length)
+        return self.read_file(path, offset, length)
+    
+    def read_source_bytes(self, path: str) -> Optional[bytes]:
+        """Read a file's raw bytes if they are UTF-8 by convention, else None.
+        
+        For such files (see _UTF8_SUFFIXES) without a byte order mark, each
+        line of ``data.decode('utf-8', 'replace')`` is exactly the line
+        read_text() would return, so callers can match bytes and decode only
+        what they report. Other files need read_text().
+        """
+        if os.path.splitext(path)[1].lower() not in _UTF8_SUFFIXES:
+            return None
+        
+        self._check_readable(path)
+        data = _read_bytes(path)
+        return None if data.startswith(_BOM_PREFIXES) else data
+    
+    def read_text(self, path: str) -> str:
+        """Read and decode a whole file, e.g. for searching."""
+        stat_info = self._check_readable(path)
+        if stat_info.st_size > _READ_CACHE_MAX_FILE_SIZE:
+            return self._read_decoded(path, stat_info.st_mtime_ns, stat_info.st_size)
+        return self._read_cached(path, stat_info.st_mtime_ns, stat_info.st_size)
+    
+    def _read_decoded(self, path: str, mtime_ns: int, size: int) -> str:
+        """Uncached read_text; mtime_ns and size only key the cache."""
+        content, _ = self._decode(_read_bytes(path), path)
+        return content
+    
+    def _check_readable(self, path: str) -> os.stat_result:
+        """Validate that path is an existing file within the size limit."""
+        # Check if file exists
+        try:
+            stat_info = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {path}")
+        
+        # Check if it's a file
+        if not stat.S_ISREG(stat_info.st_mode):
+            raise ValueError(f"Path is not a file: {path}")
+        
+        # Check file size
+        file_size = stat_info.st_size
+        if file_size > self.max_file_size:
+            raise ValueError(f"File too large: {file_size} bytes (max: {self.max_file_size})")
+        
+        return stat_info
+    
+    def _decode_window(self, window: Union[bytes, memoryview], encoding: str) -> str:
+        """Decode a byte window (any buffer), replacing characters cut at its edges."""
+        try:
+            return str(window, encoding, errors='replace')
+        except LookupError:
+            return str(window, 'utf-8', errors='replace')
+    
+    def _decode(self, raw_data: bytes, path: str = "") -> Tuple[str, str]:
+        """Decode raw file bytes, returning (content, encoding)."""
+        # Fast path: BOM-less UTF-8 (and ASCII) decodes without detection
+        if not raw_data.startswith(_BOM_PREFIXES):
             try:
-                content = raw_data.decode(encoding)
+                return raw_data.decode('utf-8'), 'utf-8'
             except UnicodeDecodeError:
-                # Fallback to utf-8 with error handling
-                content = raw_data.decode('utf-8', errors='replace')
+                pass
+        
+        # Detect encoding
+        encoding = self._detect_encoding(raw_data, path)
+        
+        # Decode content
+        try:
+            return raw_data.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            # Fallback to utf-8 with error handling
+            return raw_data.decode('utf-8', errors='replace'), 'utf-8'
+    
+    async def read_lines(
+        self,
+        path: str,
+        start_line: int,
+        end_line: int
+    ) -> str:
+        """Read an inclusive, 1-based line range, decoded as read_text() would.
+        
+        BOM-less UTF-8 sources are streamed up to end_line; other files need
+        encoding detection over their whole content and go through read_text().
+        """
+        try:
+            # Same existence, type and size checks as read_text()
+            self._check_readable(path)
+            first = max(start_line - 1, 0)
             
-            # Apply pagination
-            total_bytes = len(content.encode(encoding))
+            utf8_source = os.path.splitext(path)[1].lower() in _UTF8_SUFFIXES
+            if utf8_source:
+                with open(open_readonly(path), 'rb') as f:
+                    utf8_source = not f.read(len(_BOMS[0][0])).startswith(_BOM_PREFIXES)
+                    if utf8_source:
+                        f.seek(0)
+                        raw = b''.join(itertools.islice(f, first, end_line))
             
-            if offset > 0 or length < len(content):
-                # Convert byte offset to character offset
-                char_offset = len(content[:offset].encode(encoding))
-                char_length = len(content[char_offset:char_offset + length].encode(encoding))
+            if utf8_source:
+                code = raw.decode('utf-8', errors='replace')
                 
-                content = content[char_offset:char_offset + char_length]
+                # Match '\n'.join() of the selected lines
+                if code.endswith('\n'):
+                    code = code[:-1]
+            else:
+                code = '\n'.join(self.read_text(path).split('\n')[first:end_line])
             
-            logger.info(f"File read: {path} ({len(content)} chars, {total_bytes} bytes)")
-            return content, total_bytes
+            logger.info(f"Lines read: {path}:{start_line}-{end_line}")
+            return code
             
         except Exception as e:
-            logger.error(f"Read file error: {e}")
+            logger.error(f"Read lines error: {e}")
             raise
     
-    def _detect_encoding(self, data: bytes) -> str:
-        """Detect file encoding."""
+    def _detect_encoding(self, data: bytes, path: str = "") -> str:
+        """Detect file encoding, using the path's suffix as a hint."""
+        # Byte order marks are authoritative
+        for bom, encoding in _BOMS:
+            if data.startswith(bom):
+                return encoding
+        
+        # Source types that are UTF-8 by convention skip detection entirely
+        if os.path.splitext(path)[1].lower() in _UTF8_SUFFIXES:
+            return 'utf-8'
+        
+        # Most source files are ASCII or valid UTF-8; only fall back to
+        # chardet's (slow, pure-Python) statistical detection otherwise
+        if data.isascii():
+            return 'utf-8'
         try:
+            data.decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
+        try:
+            import chardet
+            
             result = chardet.detect(data)
             encoding = result.get('encoding', 'utf-8')
             confidence = result.get('confidence', 0)
@@ -92,7 +454,7 @@ class FileUtils:
     async def get_file_info(self, path: str) -> Dict[str, Any]:
         """Get file metadata and information."""
         try:
-            file_path = Path(path)
+            file_path = _path(path)
             
             # Check if file exists
             if not file_path.exists():
@@ -101,33 +463,7 @@ class FileUtils:
             # Get file stats
             stat_info = file_path.stat()
             
-            # Detect language from extension
-            language = self._detect_language_from_extension(file_path.suffix)
-            
-            # Get file size
-            file_size = stat_info.st_size
-            
-            # Check if file is readable
-            is_readable = os.access(file_path, os.R_OK)
-            
-            # Get file permissions
-            permissions = stat.filemode(stat_info.st_mode)
-            
-            info = {
-                "path": str(file_path),
-                "name": file_path.name,
-                "size": file_size,
-                "size_mb": round(file_size / (1024 * 1024), 2),
-                "language": language,
-                "extension": file_path.suffix,
-                "is_readable": is_readable,
-                "permissions": permissions,
-                "modified": stat_info.st_mtime,
-                "created": stat_info.st_ctime,
-                "is_file": file_path.is_file(),
-                "is_directory": file_path.is_dir(),
-                "parent": str(file_path.parent)
-            }
+            info = self._file_info_from_stat(str(file_path), stat_info)
             
             logger.info(f"File info retrieved: {path}")
             return info
@@ -136,56 +472,96 @@ class FileUtils:
             logger.error(f"Get file info error: {e}")
             raise
     
+    def _file_info_from_stat(self, path: str, stat_info: os.stat_result) -> Dict[str, Any]:
+        """Build the file info dict from an existing stat result."""
+        name = os.path.basename(path)
+        
+        # Match Path.suffix, which ignores a bare trailing dot
+        _, extension = os.path.splitext(name)
+        if len(extension) < 2:
+            extension = ""
+        
+        # Detect language from extension
+        language = self._detect_language_from_extension(extension)
+        
+        # Get file size
+        file_size = stat_info.st_size
+        
+        # Check if file is readable
+        is_readable = os.access(path, os.R_OK)
+        
+        # Get file permissions
+        permissions = stat.filemode(stat_info.st_mode)
+        
+        return {
+            "path": path,
+            "name": name,
+            "size": file_size,
+            "size_mb": round(file_size / (1024 * 1024), 2),
+            "language": language,
+            "extension": extension,
+            "is_readable": is_readable,
+            "permissions": permissions,
+            "modified": stat_info.st_mtime,
+            "created": stat_info.st_ctime,
+            "is_file": stat.S_ISREG(stat_info.st_mode),
+            "is_directory": stat.S_ISDIR(stat_info.st_mode),
+            "parent": os.path.dirname(path) or "."
+        }
+    
     def _detect_language_from_extension(self, extension: str) -> str:
         """Detect programming language from file extension."""
-        language_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.jsx': 'javascript',
-            '.tsx': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.h': 'c',
-            '.hpp': 'cpp',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.php': 'php',
-            '.rb': 'ruby',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.scala': 'scala',
-            '.r': 'r',
-            '.m': 'matlab',
-            '.sh': 'bash',
-            '.bash': 'bash',
-            '.zsh': 'zsh',
-            '.fish': 'fish',
-            '.ps1': 'powershell',
-            '.bat': 'batch',
-            '.cmd': 'batch',
-            '.sql': 'sql',
-            '.html': 'html',
-            '.css': 'css',
-            '.scss': 'scss',
-            '.sass': 'sass',
-            '.less': 'less',
-            '.xml': 'xml',
-            '.json': 'json',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.toml': 'toml',
-            '.ini': 'ini',
-            '.cfg': 'ini',
-            '.conf': 'ini',
-            '.md': 'markdown',
-            '.rst': 'restructuredtext',
-            '.txt': 'text',
-            '.log': 'log'
-        }
+        return _LANGUAGE_MAP.get(extension.lower(), 'unknown')
+    
+    def iter_files(
+        self,
+        directory: str,
+        recursive: bool = True,
+        include_hidden: bool = False
+    ) -> Iterator[Tuple[str, os.DirEntry]]:
+        """Walk a directory with os.scandir, yielding (path, entry) for each file.
+        
+        Ignore patterns are matched against paths relative to ``directory``:
+        matching directories are pruned without being entered and matching
+        files are skipped. Symlinks are not followed. Paths are joined onto
+        ``directory`` as given, with a leading "./" dropped.
+        """
+        repositories = self.settings.repositories
+        return walk_files(
+            [directory],
+            repositories.is_dir_ignored,
+            recursive=recursive,
+            include_hidden=include_hidden,
+            is_file_ignored=repositories.is_ignored
+        )
+    
+    def stat_files(
+        self,
+        directory: str,
+        recursive: bool = True,
+        include_hidden: bool = False,
+        include: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, os.stat_result]]:
+        """Walk a directory like iter_files, returning (path, stat) for each file.
+        
+        Files rejected by include and files over the size limit are left out.
+        All files are stat'ed in one batch (see stat_entries); list_files and
+        the search engine both select their files through here.
+        """
+        candidates = [
+            (file_path, entry)
+            for file_path, entry in self.iter_files(directory, recursive, include_hidden)
+            if include is None or include(file_path)
+        ]
+        stats = stat_entries([entry for _, entry in candidates])
         
-        return language_map.get(extension.lower(), 'unknown')
+        results = []
+        for (file_path, _), stat_info in zip(candidates, stats):
+            if stat_info is None:
+                logger.warning(f"Error getting info for {file_path}")
+            elif self._should_include_file(file_path, stat_info.st_size):
+                results.append((file_path, stat_info))
+        return results
     
     async def list_files(
         self,
@@ -195,7 +571,7 @@ class FileUtils:
     ) -> List[Dict[str, Any]]:
         """List files in a directory."""
         try:
-            dir_path = Path(directory)
+            dir_path = _path(directory)
             
             if not dir_path.exists():
                 raise FileNotFoundError(f"Directory not found: {directory}")
@@ -203,30 +579,16 @@ class FileUtils:
             if not dir_path.is_dir():
                 raise ValueError(f"Path is not a directory: {directory}")
             
-            files = []
-            
-            if recursive:
-                pattern = "**/*"
-            else:
-                pattern = "*"
-            
-            for file_path in dir_path.glob(pattern):
-                # Skip hidden files if not requested
-                if not include_hidden and file_path.name.startswith('.'):
-                    continue
-                
-                # Skip if it's a directory
-                if file_path.is_dir():
-                    continue
-                
-                # Check if file should be included
-                if self._should_include_file(file_path):
-                    try:
-                        file_info = await self.get_file_info(str(file_path))
-                        files.append(file_info)
-                    except Exception as e:
-                        logger.warning(f"Error getting info for {file_path}: {e}")
-                        continue
+            # Hidden directories are still walked; only hidden file names are skipped
+            files = [
+                self._file_info_from_stat(file_path, stat_info)
+                for file_path, stat_info in self.stat_files(
+                    directory,
+                    recursive,
+                    include_hidden=True,
+                    include=None if include_hidden else _is_visible
+                )
+            ]
             
             logger.info(f"Listed {len(files)} files in {directory}")
             return files
@@ -235,19 +597,10 @@ class FileUtils:
             logger.error(f"List files error: {e}")
             raise
     
-    def _should_include_file(self, file_path: Path) -> bool:
-        """Check if file should be included in listings."""
-        # Check ignore patterns
-        for pattern in self.settings.repositories.ignore_patterns:
-            if file_path.match(pattern):
-                return False
-        
+    def _should_include_file(self, file_path: str, file_size: int) -> bool:
+        """Check if file should be included in listings (ignored files never reach here)."""
         # Check file size
-        try:
-            file_size = file_path.stat().st_size
-            if file_size > self.max_file_size:
-                return False
-        except OSError:
+        if file_size > self.max_file_size:
             return False
         
         return True
@@ -0,0 +1,44 @@
+"""
+Result records produced by the search engine.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """A single line matching a search query."""
+    path: str
+    line: int
+    snippet: str
+    match: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dict shape returned by the analyzer and tools."""
+        return {
+            'path': self.path,
+            'line': self.line,
+            'snippet': self.snippet,
+            'match': self.match
+        }
+
+
+@dataclass(slots=True)
+class TodoItem:
+    """A TODO/FIXME-style comment found in a file."""
+    path: str
+    line: int
+    text: str
+    type: str
+    snippet: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the dict shape returned by the analyzer and tools."""
+        return {
+            'path': self.path,
+            'line': self.line,
+            'text': self.text,
+            'type': self.type,
+            'snippet': self.snippet
+        }
@@ -3,14 +3,61 @@ Search engine for code analysis.
 """
 
 import asyncio
+import mmap
 import re
 import os
-from pathlib import Path
-from typing import Dict, List, Any, Optional
-import glob
+import threading
+from functools import lru_cache
+from typing import AnyStr, Callable, List, Any, Optional, Pattern, Tuple, Union
 from loguru import logger
 
-from .file_utils import FileUtils
+from .file_utils import FileUtils, open_readonly
+from .results import SearchHit, TodoItem
+from .search_rg import RipgrepSearch
+from .trigram import TrigramIndex
+
+# Source file extensions searched for code and TODOs
+_SEARCH_EXTENSIONS = frozenset({
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h',
+    '.go', '.rs', '.php', '.rb', '.swift', '.kt'
+})
+
+# Files scanned concurrently per batch; bounds in-flight file contents
+_SCAN_BATCH_SIZE = 64
+
+# Upper bound on files open at once across all concurrent scans. A thread
+# semaphore (rather than asyncio's) is shared safely by every event loop,
+# e.g. the MCP server's and the Streamlit app's in one process
+_MAX_OPEN_FILES = min((os.cpu_count() or 1) * 4, 256)
+_open_files = threading.BoundedSemaphore(_MAX_OPEN_FILES)
+
+# Files above this size are searched through mmap instead of being read
+_MMAP_THRESHOLD = 256 * 1024
+
+
+@lru_cache(maxsize=128)
+def _compile_query(query: AnyStr, regex: bool, case_sensitive: bool) -> Pattern[AnyStr]:
+    """Compile a search query once for all files and repeated searches.
+    
+    Text queries are escaped so both modes share one scan.
+    """
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(query if regex else re.escape(query), flags)
+
+
+@lru_cache(maxsize=16)
+def _build_todo_re(patterns: Tuple[str, ...], case_sensitive: bool) -> Pattern[str]:
+    """Compile TODO markers into one alternation with named groups.
+    
+    The separator never crosses a line break, and the text starts past the
+    separator and runs to the line break, so the pattern can scan a whole
+    file, each hit stays on one line and a bare marker (even before a CRLF)
+    yields no empty item.
+    """
+    return re.compile(
+        r'(?P<type>' + '|'.join(map(re.escape, patterns)) + r')(?:[^\S\r\n]|:)*(?P<text>[^\s:][^\r\n]*)',
+        0 if case_sensitive else re.IGNORECASE
+    )
 
 
 class SearchEngine:
@@ -20,15 +67,24 @@ class SearchEngine:
         self.settings = settings
         self.file_utils = FileUtils(settings)
         
-        # TODO patterns
-        self.todo_patterns = [
-            r'TODO[:\s]*(.+)',
-            r'FIXME[:\s]*(.+)',
-            r'HACK[:\s]*(.+)',
-            r'NOTE[:\s]*(.+)',
-            r'XXX[:\s]*(.+)',
-            r'BUG[:\s]*(.+)'
-        ]
+        # Optional ripgrep backend for search(); None when disabled or missing
+        self.ripgrep = RipgrepSearch.create(settings, _SEARCH_EXTENSIONS)
+        
+        # Optional trigram index narrowing Python text searches to candidates
+        self.trigram_index = (
+            TrigramIndex(self.file_utils.read_text) if settings.search.use_trigram_index else None
+        )
+        
+        # TODO markers compiled once per distinct configuration
+        todos = settings.todos
+        self._todo_re = _build_todo_re(tuple(todos.patterns), todos.case_sensitive)
+        
+        # Literal markers for the cheap substring prefilter (upper-cased when
+        # matching case-insensitively, so lines only need one .upper())
+        self._todo_case_sensitive = todos.case_sensitive
+        self._todo_markers = tuple(
+            p if todos.case_sensitive else p.upper() for p in todos.patterns
+        )
         
         logger.info("SearchEngine initialized")
     
@@ -39,34 +95,74 @@ class SearchEngine:
         case_sensitive: bool = False,
         path_prefix: str = "",
         limit: int = 50
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SearchHit]:
         """Search for code using text or regex patterns."""
         try:
-            results = []
-            search_paths = self._get_search_paths(path_prefix)
-            
-            for file_path in search_paths:
-                if len(results) >= limit:
-                    break
-                
+            if self.ripgrep is not None:
                 try:
-                    # Read file content
-                    content, _ = await self.file_utils.read_file(file_path)
-                    
-                    # Search in file
-                    file_results = self._search_in_file(
-                        content=content,
-                        file_path=file_path,
+                    results = await self.ripgrep.search(
                         query=query,
+                        roots=self._get_search_roots(path_prefix),
                         regex=regex,
-                        case_sensitive=case_sensitive
+                        case_sensitive=case_sensitive,
+                        limit=limit
                     )
                     
-                    results.extend(file_results)
+                    logger.info(f"Search completed (ripgrep): {len(results)} results")
+                    return results
                     
                 except Exception as e:
-                    logger.warning(f"Error searching in {file_path}: {e}")
-                    continue
+                    logger.warning(f"ripgrep search failed, using Python search: {e}")
+            
+            search_stats = self._get_search_stats(path_prefix)
+            
+            # Only files holding every trigram of a text query are scanned
+            if self.trigram_index is not None and not regex and query.isascii():
+                search_stats = await asyncio.to_thread(
+                    self.trigram_index.candidates,
+                    search_stats,
+                    query,
+                    self._get_search_roots(path_prefix)
+                )
+            search_paths = [(file_path, stat_info.st_size) for file_path, stat_info in search_stats]
+            
+            # ASCII text queries can be matched against raw bytes: large files
+            # through mmap, UTF-8 sources as read. Regexes always run on text,
+            # since \w, \s, \b and . only see ASCII/single bytes in a bytes
+            # pattern and results would depend on the file size
+            use_bytes = not regex and query.isascii()
+            
+            def scan(file_path: str, file_size: int) -> List[SearchHit]:
+                if use_bytes and file_size > _MMAP_THRESHOLD:
+                    return self._search_in_mmap(
+                        file_path=file_path,
+                        query=query,
+                        case_sensitive=case_sensitive
+                    )
+                
+                if use_bytes:
+                    data = self.file_utils.read_source_bytes(file_path)
+                    if data is not None:
+                        return self._search_in_bytes(
+                            data=data,
+                            file_path=file_path,
+                            query=query,
+                            case_sensitive=case_sensitive
+                        )
+                
+                # Read file content
+                content = self.file_utils.read_text(file_path)
+                
+                # Search in file
+                return self._search_in_file(
+                    content=content,
+                    file_path=file_path,
+                    query=query,
+                    regex=regex,
+                    case_sensitive=case_sensitive
+                )
+            
+            results = await self._scan_files(search_paths, scan, "searching in", limit)
             
             # Sort by relevance and limit results
             results = results[:limit]
@@ -78,54 +174,78 @@ class SearchEngine:
             logger.error(f"Search error: {e}")
             raise
     
-    def _get_search_paths(self, path_prefix: str = "") -> List[str]:
-        """Get list of files to search."""
-        search_paths = []
+    async def _scan_files(
+        self,
+        paths: List[Tuple[str, int]],
+        scan: Callable[[str, int], List[Any]],
+        action: str,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """Run scan over files in worker threads, keeping results in path order.
+        
+        Files are processed in batches of _SCAN_BATCH_SIZE; no further batches
+        are started once limit results have been collected.
+        """
+        def scan_file(file_path: str, file_size: int) -> List[Any]:
+            try:
+                with _open_files:
+                    return scan(file_path, file_size)
+            except Exception as e:
+                logger.warning(f"Error {action} {file_path}: {e}")
+                return []
+        
+        results = []
+        for start in range(0, len(paths), _SCAN_BATCH_SIZE):
+            batch = paths[start:start + _SCAN_BATCH_SIZE]
+            for file_results in await asyncio.gather(
+                *(asyncio.to_thread(scan_file, file_path, file_size) for file_path, file_size in batch)
+            ):
+                results.extend(file_results)
+            
+            if limit is not None and len(results) >= limit:
+                break
+        
+        return results
+    
+    def _get_search_roots(self, path_prefix: str = "") -> List[str]:
+        """Get existing directories to search under, one per repository root."""
+        search_roots = []
         
         # Get repository roots
         roots = self.settings.repositories.roots or ["."]
         
         for root in roots:
-            root_path = Path(root)
-            if not root_path.exists():
-                continue
-            
-            # Build search pattern
-            if path_prefix:
-                search_pattern = str(root_path / path_prefix / "**" / "*")
-            else:
-                search_pattern = str(root_path / "**" / "*")
-            
-            # Get files matching pattern
-            for file_path in glob.glob(search_pattern, recursive=True):
-                if os.path.isfile(file_path) and self._should_search_file(file_path):
-                    search_paths.append(file_path)
+            search_root = os.path.join(root, path_prefix) if path_prefix else root
+            if os.path.isdir(search_root):
+                search_roots.append(search_root)
         
-        return search_paths
+        return search_roots
     
-    def _should_search_file(self, file_path: str) -> bool:
-        """Check if file should be searched."""
-        file_path = Path(file_path)
+    def _get_search_paths(self, path_prefix: str = "") -> List[Tuple[str, int]]:
+        """Get (path, size) for each file to search."""
+        return [
+            (file_path, stat_info.st_size)
+            for file_path, stat_info in self._get_search_stats(path_prefix)
+        ]
+    
+    def _get_search_stats(self, path_prefix: str = "") -> List[Tuple[str, os.stat_result]]:
+        """Get (path, stat) for each file to search."""
+        search_stats = []
         
-        # Check file extension
-        if file_path.suffix not in ['.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', '.go', '.rs', '.php', '.rb', '.swift', '.kt']:
-            return False
+        # Walk with scandir, pruning ignored directories on the way down, and
+        # check file sizes from the directory entries in one batch per root
+        for search_root in self._get_search_roots(path_prefix):
+            search_stats.extend(self.file_utils.stat_files(search_root, include=self._should_search_file))
         
-        # Check ignore patterns
-        for pattern in self.settings.repositories.ignore_patterns:
-            if file_path.match(pattern):
-                return False
+        return search_stats
+    
+    def _should_search_file(self, file_path: str) -> bool:
+        """Check if file should be searched, by extension.
         
-        # Check file size
-        try:
-            file_size = file_path.stat().st_size
-            max_size = self.settings.server.max_file_size_mb * 1024 * 1024
-            if file_size > max_size:
-                return False
-        except OSError:
-            return False
-        
-        return True
+        Files matching the ignore patterns were already skipped by the walk.
+        """
+        _, suffix = os.path.splitext(os.path.basename(file_path))
+        return suffix in _SEARCH_EXTENSIONS
     
     def _search_in_file(
         self,
@@ -134,70 +254,138 @@ class SearchEngine:
         query: str,
         regex: bool = False,
         case_sensitive: bool = False
-    ) -> List[Dict[str, Any]]:
+    ) -> List[SearchHit]:
         """Search for query in file content."""
-        results = []
-        lines = content.split('\n')
+        try:
+            pattern = _compile_query(query, regex, case_sensitive)
+        except re.error as e:
+            logger.warning(f"Regex error in {file_path}: {e}")
+            return []
+        
+        return self._search_lines(content, pattern, file_path, query, regex)
+    
+    def _search_in_bytes(
+        self,
+        data: bytes,
+        file_path: str,
+        query: str,
+        case_sensitive: bool = False
+    ) -> List[SearchHit]:
+        """Search UTF-8 file bytes for a text query, decoding only hit lines."""
+        pattern = _compile_query(query.encode('ascii'), False, case_sensitive)
+        return self._search_lines(data, pattern, file_path, query, False)
+    
+    def _search_in_mmap(
+        self,
+        file_path: str,
+        query: str,
+        case_sensitive: bool = False
+    ) -> List[SearchHit]:
+        """Search a memory-mapped file as UTF-8 bytes for a text query, decoding only hit lines."""
+        pattern = _compile_query(query.encode('ascii'), False, case_sensitive)
         
+        fd = open_readonly(file_path)
         try:
-            if regex:
-                # Regex search
-                flags = 0 if case_sensitive else re.IGNORECASE
-                pattern = re.compile(query, flags)
-                
-                for line_num, line in enumerate(lines, 1):
-                    if pattern.search(line):
-                        results.append({
-                            'path': file_path,
-                            'line': line_num,
-                            'snippet': line.strip(),
-                            'match': pattern.search(line).group()
-                        })
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                return self._search_lines(mapped, pattern, file_path, query, False)
+        finally:
+            os.close(fd)
+    
+    def _search_lines(
+        self,
+        content: Union[str, bytes, mmap.mmap],
+        pattern: Pattern,
+        file_path: str,
+        query: str,
+        regex: bool
+    ) -> List[SearchHit]:
+        """Scan content with one compiled pattern, yielding at most one result per line.
+        
+        content may be str, or bytes-like (e.g. an mmap) paired with a bytes
+        pattern, in which case only the hit lines are decoded as UTF-8.
+        """
+        results = []
+        search = pattern.search
+        
+        is_text = isinstance(content, str)
+        newline = '\n' if is_text else b'\n'
+        has_count = hasattr(content, 'count')
+        
+        line_num = 1
+        counted = 0
+        pos = 0
+        content_length = len(content)
+        
+        while pos <= content_length:
+            match = search(content, pos)
+            if match is None:
+                break
+            
+            # Advance the line number incrementally from the previous hit
+            # (mmap has no count(), so mapped content counts a slice)
+            start = match.start()
+            if has_count:
+                line_num += content.count(newline, counted, start)
             else:
-                # Text search
-                search_text = query if case_sensitive else query.lower()
+                line_num += content[counted:start].count(newline)
+            counted = start
+            
+            line_start = content.rfind(newline, 0, start) + 1
+            line_end = content.find(newline, start)
+            if line_end == -1:
+                line_end = content_length
+            
+            # A match running past the end of its line (e.g. via \s) is
+            # retried within that line to keep per-line semantics
+            if match.end() > line_end:
+                match = search(content, line_start, line_end)
+            
+            if match is not None:
+                snippet = content[line_start:line_end]
+                matched = match.group() if regex else query
+                if not is_text:
+                    snippet = snippet.decode('utf-8', errors='replace')
+                    if regex:
+                        matched = matched.decode('utf-8', errors='replace')
                 
-                for line_num, line in enumerate(lines, 1):
-                    line_text = line if case_sensitive else line.lower()
-                    
-                    if search_text in line_text:
-                        # Find the position of the match
-                        start_pos = line_text.find(search_text)
-                        end_pos = start_pos + len(search_text)
-                        
-                        # Create snippet with context
-                        snippet = line.strip()
-                        
-                        results.append({
-                            'path': file_path,
-                            'line': line_num,
-                            'snippet': snippet,
-                            'match': query
-                        })
-        
-        except re.error as e:
-            logger.warning(f"Regex error in {file_path}: {e}")
+                results.append(SearchHit(
+                    path=file_path,
+                    line=line_num,
+                    snippet=snippet.strip(),
+                    match=matched
+                ))
+            
+            # At most one result per line
+            pos = line_end + 1
         
         return results
     
-    async def find_todos(self, path_prefix: str = "") -> List[Dict[str, Any]]:
+    async def find_todos(self, path_prefix: str = "") -> List[TodoItem]:
         """Find TODO/FIXME comments in the codebase."""
         try:
-            todos = []
-            search_paths = self._get_search_paths(path_prefix)
-            
-            for file_path in search_paths:
+            if self.ripgrep is not None:
                 try:
-                    # Read file content
-                    content, _ = await self.file_utils.read_file(file_path)
+                    todos = await self.ripgrep.find_todos(
+                        markers=self.settings.todos.patterns,
+                        todo_re=self._todo_re,
+                        roots=self._get_search_roots(path_prefix),
+                        case_sensitive=self._todo_case_sensitive
+                    )
                     
-                    # Find TODOs in file
-                    file_todos = self._find_todos_in_file(content, file_path)
-                    todos.extend(file_todos)
+                    logger.info(f"TODO search completed (ripgrep): {len(todos)} items found")
+                    return todos
                     
                 except Exception as e:
-                    logger.warning(f"Error searching TODOs in {file_path}: {e}")
-                    continue
+                    logger.warning(f"ripgrep TODO search failed, using Python search: {e}")
+            
+            search_paths = self._get_search_paths(path_prefix)
+            
+            def scan(file_path: str, file_size: int) -> List[TodoItem]:
+                # Find TODOs in file
+                content = self.file_utils.read_text(file_path)
+                return self._find_todos_in_file(content, file_path)
+            
+            todos = await self._scan_files(search_paths, scan, "searching TODOs in")
             
             logger.info(f"TODO search completed: {len(todos)} items found")
             return todos
@@ -206,24 +394,35 @@ class SearchEngine:
             logger.error(f"TODO search error: {e}")
             raise
     
-    def _find_todos_in_file(self, content: str, file_path: str) -> List[Dict[str, Any]]:
+    def _find_todos_in_file(self, content: str, file_path: str) -> List[TodoItem]:
         """Find TODO comments in file content."""
         todos = []
-        lines = content.split('\n')
-        
-        for line_num, line in enumerate(lines, 1):
-            for pattern in self.todo_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    todo_text = match.group(1).strip()
-                    todo_type = match.group(0).split(':')[0].strip()
-                    
-                    todos.append({
-                        'path': file_path,
-                        'line': line_num,
-                        'text': todo_text,
-                        'type': todo_type,
-                        'snippet': line.strip()
-                    })
+        markers = self._todo_markers
+        case_sensitive = self._todo_case_sensitive
+        
+        # Skip files without any marker before running the pattern
+        haystack = content if case_sensitive else content.upper()
+        if not any(marker in haystack for marker in markers):
+            return todos
+        
+        line_num = 1
+        counted = 0
+        
+        # One pass over the whole file; at most one hit per line
+        for match in self._todo_re.finditer(content):
+            # Advance the line number incrementally from the previous hit
+            start = match.start()
+            line_num += content.count('\n', counted, start)
+            counted = start
+            
+            # The match ends at the end of its line
+            line_start = content.rfind('\n', 0, start) + 1
+            todos.append(TodoItem(
+                path=file_path,
+                line=line_num,
+                text=match.group('text').strip(),
+                type=match.group('type'),
+                snippet=content[line_start:match.end()].strip()
+            ))
         
         return todos
@@ -0,0 +1,204 @@
+"""
+Ripgrep backend for code search.
+"""
+
+import asyncio
+import contextlib
+import os
+import shutil
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Pattern
+from loguru import logger
+
+from .results import SearchHit, TodoItem
+
+# rg emits one JSON event per line; orjson parses them faster when installed
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+
+class RipgrepSearch:
+    """Run text/regex searches through the ``rg`` binary."""
+    
+    def __init__(self, settings, rg_path: str, extensions: Iterable[str]):
+        self.settings = settings
+        self.rg_path = rg_path
+        
+        # File selection mirrors SearchEngine._should_search_file
+        self._glob_args = []
+        for ext in sorted(extensions):
+            self._glob_args += ["--glob", f"*{ext}"]
+        for pattern in settings.repositories.ignore_patterns:
+            self._glob_args += ["--glob", f"!{pattern}"]
+        
+        # Longest event line read from rg: a matched line is at most one file,
+        # which JSON escaping (\u00XX) can grow up to six times
+        self._line_limit = 6 * (settings.server.max_file_size_mb << 20) + (64 << 10)
+        
+        logger.info(f"RipgrepSearch initialized ({rg_path})")
+    
+    @classmethod
+    def create(cls, settings, extensions: Iterable[str]) -> Optional["RipgrepSearch"]:
+        """Return a backend if enabled in settings and ``rg`` is on PATH."""
+        if not settings.search.use_ripgrep:
+            return None
+        
+        rg_path = shutil.which("rg")
+        if rg_path is None:
+            logger.info("ripgrep not found on PATH, using Python search")
+            return None
+        
+        return cls(settings, rg_path, extensions)
+    
+    def _build_command(
+        self,
+        patterns: Iterable[str],
+        roots: List[str],
+        regex: bool,
+        case_sensitive: bool
+    ) -> List[str]:
+        """Build the rg command line; a line matches if any pattern does."""
+        cmd = [
+            self.rg_path,
+            "--json",
+            "--no-config",
+            "--no-ignore",
+            "--max-filesize", f"{self.settings.server.max_file_size_mb}M",
+            "--case-sensitive" if case_sensitive else "--ignore-case",
+        ]
+        if not regex:
+            cmd.append("--fixed-strings")
+        cmd += self._glob_args
+        for pattern in patterns:
+            cmd += ["--regexp", pattern]
+        cmd.append("--")
+        cmd += roots
+        return cmd
+    
+    async def _iter_matches(self, cmd: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Run rg and yield the data of each ``match`` event as it arrives.
+        
+        Events are parsed while rg is still searching, and closing the
+        generator early kills rg. Raises RuntimeError if rg fails (e.g. a
+        regex it cannot parse), so the caller can fall back to the Python
+        scanner.
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=self._line_limit
+        )
+        
+        # Drain stderr alongside stdout so rg never blocks on a full pipe
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        try:
+            async for raw_line in proc.stdout:
+                event = loads(raw_line)
+                if event.get("type") == "match":
+                    yield event["data"]
+            
+            stderr = await stderr_task
+            await proc.wait()
+            
+            # Exit code 1 means no matches; anything else above that is an error
+            if proc.returncode not in (0, 1):
+                message = stderr.decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"rg exited with {proc.returncode}: {message}")
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            stderr_task.cancel()
+    
+    async def search(
+        self,
+        query: str,
+        roots: List[str],
+        regex: bool = False,
+        case_sensitive: bool = False,
+        limit: int = 50
+    ) -> List[SearchHit]:
+        """Search roots with rg, returning results in SearchEngine's format."""
+        # rg with no paths would search the working directory instead
+        if not roots or limit <= 0:
+            return []
+        
+        cmd = self._build_command([query], roots, regex, case_sensitive)
+        
+        # Stop rg as soon as the limit is reached
+        results = []
+        async with contextlib.aclosing(self._iter_matches(cmd)) as matches:
+            async for data in matches:
+                result = self._parse_match(data, query, regex)
+                if result is not None:
+                    results.append(result)
+                    if len(results) >= limit:
+                        break
+        
+        return results
+    
+    async def find_todos(
+        self,
+        markers: Iterable[str],
+        todo_re: Pattern[str],
+        roots: List[str],
+        case_sensitive: bool = False
+    ) -> List[TodoItem]:
+        """Find TODO comments under roots with rg.
+        
+        rg selects the lines containing any marker; todo_re, the pattern the
+        Python scanner uses, then extracts type and text from each line.
+        """
+        if not roots:
+            return []
+        
+        cmd = self._build_command(markers, roots, False, case_sensitive)
+        
+        todos = []
+        async with contextlib.aclosing(self._iter_matches(cmd)) as matches:
+            async for data in matches:
+                todo = self._parse_todo(data, todo_re)
+                if todo is not None:
+                    todos.append(todo)
+        
+        return todos
+    
+    def _parse_match(self, data: Dict[str, Any], query: str, regex: bool) -> Optional[SearchHit]:
+        """Convert one rg ``match`` event into a SearchHit."""
+        # Non-UTF-8 paths and lines are reported as base64 "bytes"; skip them
+        path = data["path"].get("text")
+        line = data["lines"].get("text")
+        if path is None or line is None:
+            return None
+        
+        match = query
+        if regex and data.get("submatches"):
+            match = data["submatches"][0]["match"].get("text", query)
+        
+        return SearchHit(
+            path=os.path.normpath(path),
+            line=data["line_number"],
+            snippet=line.strip(),
+            match=match
+        )
+    
+    def _parse_todo(self, data: Dict[str, Any], todo_re: Pattern[str]) -> Optional[TodoItem]:
+        """Convert one rg ``match`` event into a TodoItem, if the line holds one."""
+        path = data["path"].get("text")
+        line = data["lines"].get("text")
+        if path is None or line is None:
+            return None
+        
+        match = todo_re.search(line)
+        if match is None:
+            return None
+        
+        return TodoItem(
+            path=os.path.normpath(path),
+            line=data["line_number"],
+            text=match.group('text').strip(),
+            type=match.group('type'),
+            snippet=line.strip()
+        )
@@ -0,0 +1,161 @@
+"""
+Trigram index for narrowing text searches to candidate files.
+"""
+
+import os
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+
+# Stop indexing new files once this much source is indexed
+MAX_INDEXED_BYTES = 32 * 1024 * 1024
+
+
+def trigrams(text: str) -> Set[int]:
+    """Return the UTF-8 byte trigrams in text, each packed into an int."""
+    data = text.encode("utf-8", "surrogatepass")
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+class TrigramIndex:
+    """In-memory inverted index from case-folded trigrams to file ids.
+    
+    Files are indexed lazily, the first time a search sees them and again
+    whenever their mtime or size changes, so the index never needs a separate
+    build step and repeated searches only read the files that can match.
+    Removed files are dropped from the posting lists in batches, and once
+    max_bytes of source is indexed further files are left unindexed.
+    """
+    
+    def __init__(self, read_text: Callable[[str], str], max_bytes: int = MAX_INDEXED_BYTES):
+        self.read_text = read_text
+        self.max_bytes = max_bytes
+        
+        # path -> (mtime_ns, size, file id); postings are arrays of file ids,
+        # and ids of removed files linger there until the next compaction
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        self._paths: Dict[int, str] = {}
+        self._postings: Dict[int, array] = {}
+        self._dead: Set[int] = set()
+        self._next_id = 0
+        self._indexed_bytes = 0
+        self._lock = threading.Lock()
+    
+    def candidates(
+        self,
+        files: List[Tuple[str, os.stat_result]],
+        query: str,
+        scope: Iterable[str] = ()
+    ) -> List[Tuple[str, os.stat_result]]:
+        """Return the files that may contain query, keeping their order.
+        
+        Matching is case-insensitive, so the result holds for both case modes.
+        Queries shorter than three bytes cannot be narrowed, and files that
+        are not indexed are always kept. files must be every searchable file
+        under the scope directories; indexed files there that are no longer
+        listed (deleted, renamed or now ignored) are evicted.
+        """
+        needed = trigrams(query.casefold())
+        if not needed:
+            return files
+        
+        # Find new or changed files under the lock, but read them outside it,
+        # storing each one as it is read
+        with self._lock:
+            stale = self._stale(files)
+        
+        for path, stat_info in stale:
+            file_trigrams = self._read_trigrams(path)
+            with self._lock:
+                self._store(path, stat_info, file_trigrams)
+        
+        with self._lock:
+            self._evict(files, scope)
+            if len(self._dead) > len(self._paths):
+                self._compact()
+            
+            # Intersect the shortest posting lists first
+            postings = sorted((self._postings.get(t, ()) for t in needed), key=len)
+            ids = set(postings[0])
+            for posting in postings[1:]:
+                ids.intersection_update(posting)
+            paths = self._paths
+            matched = {paths[file_id] for file_id in ids if file_id in paths}
+            indexed = self._files
+            
+            return [
+                (path, stat_info) for path, stat_info in files
+                if path in matched or path not in indexed
+            ]
+    
+    def _stale(self, files: List[Tuple[str, os.stat_result]]) -> List[Tuple[str, os.stat_result]]:
+        """Return the new or changed files that fit in the index."""
+        budget = self.max_bytes - self._indexed_bytes
+        stale = []
+        for path, stat_info in files:
+            entry = self._files.get(path)
+            if entry is not None:
+                if entry[:2] != (stat_info.st_mtime_ns, stat_info.st_size):
+                    stale.append((path, stat_info))
+            elif stat_info.st_size <= budget:
+                budget -= stat_info.st_size
+                stale.append((path, stat_info))
+        return stale
+    
+    def _read_trigrams(self, path: str) -> Optional[Set[int]]:
+        """Read path and return its case-folded trigrams, or None if unreadable."""
+        try:
+            return trigrams(self.read_text(path).casefold())
+        except Exception as e:
+            logger.debug(f"Not indexing {path}: {e}")
+            return None
+    
+    def _store(self, path: str, stat_info: os.stat_result, file_trigrams: Optional[Set[int]]) -> None:
+        """Replace the entry for path; unreadable files are left unindexed."""
+        if path in self._files:
+            self._remove(path)
+        
+        if file_trigrams is None:
+            return
+        
+        file_id = self._next_id
+        self._next_id += 1
+        self._files[path] = (stat_info.st_mtime_ns, stat_info.st_size, file_id)
+        self._paths[file_id] = path
+        self._indexed_bytes += stat_info.st_size
+        for trigram in file_trigrams:
+            self._postings.setdefault(trigram, array("I")).append(file_id)
+    
+    def _evict(self, files: List[Tuple[str, os.stat_result]], scope: Iterable[str]) -> None:
+        """Drop indexed paths under the scope directories that files no longer lists."""
+        prefixes = []
+        for directory in scope:
+            base = os.path.normpath(directory)
+            prefixes.append("" if base == "." else base.rstrip(os.sep) + os.sep)
+        if not prefixes:
+            return
+        
+        listed = {path for path, _ in files}
+        prefixes = tuple(prefixes)
+        gone = [path for path in self._files if path not in listed and path.startswith(prefixes)]
+        for path in gone:
+            self._remove(path)
+    
+    def _remove(self, path: str) -> None:
+        """Drop path from the index, leaving its id in the postings until compaction."""
+        _, size, file_id = self._files.pop(path)
+        del self._paths[file_id]
+        self._dead.add(file_id)
+        self._indexed_bytes -= size
+    
+    def _compact(self) -> None:
+        """Remove the ids of dropped files from the posting lists."""
+        dead = self._dead
+        for trigram, ids in list(self._postings.items()):
+            live = array("I", (file_id for file_id in ids if file_id not in dead))
+            if live:
+                self._postings[trigram] = live
+            else:
+                del self._postings[trigram]
+        dead.clear()
@@ -0,0 +1,94 @@
+"""
+Parallel directory walking.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from loguru import logger
+
+# Shared pool scanning the directories of one tree level concurrently
+_walk_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_walk_pool() -> ThreadPoolExecutor:
+    """Return the shared directory-scanning thread pool."""
+    global _walk_pool
+    if _walk_pool is None:
+        _walk_pool = ThreadPoolExecutor(thread_name_prefix="codecompass-walk")
+    return _walk_pool
+
+
+def _scan_dir(
+    current: str,
+    relative: str,
+    is_dir_ignored: Callable[[str, str], bool],
+    is_file_ignored: Optional[Callable[[str], bool]],
+    recursive: bool,
+    include_hidden: bool
+) -> Tuple[List[Tuple[str, os.DirEntry]], List[Tuple[str, str]]]:
+    """List one directory, returning its (path, entry) files and (path, relative) subdirectories."""
+    files = []
+    subdirs = []
+    
+    try:
+        with os.scandir(current or ".") as entries:
+            for entry in entries:
+                if not include_hidden and entry.name.startswith('.'):
+                    continue
+                
+                entry_path = os.path.join(current, entry.name) if current else entry.name
+                entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not is_dir_ignored(entry_relative, entry.name):
+                            subdirs.append((entry_path, entry_relative))
+                    elif entry.is_file(follow_symlinks=False):
+                        if is_file_ignored is None or not is_file_ignored(entry_relative):
+                            files.append((entry_path, entry))
+                except OSError:
+                    continue
+    except OSError as e:
+        logger.warning(f"Cannot scan directory {current or '.'}: {e}")
+    
+    return files, subdirs
+
+
+def walk_files(
+    directories: Iterable[str],
+    is_dir_ignored: Callable[[str, str], bool],
+    recursive: bool = True,
+    include_hidden: bool = False,
+    is_file_ignored: Optional[Callable[[str], bool]] = None
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Walk directories with os.scandir, yielding (path, entry) for each file.
+    
+    The tree is walked level by level and the directories of each level are
+    scanned in parallel on a shared thread pool, so readdir/stat latency
+    overlaps; output is in a deterministic breadth-first order. Directories
+    for which is_dir_ignored(relative_path, name) is true are pruned without
+    being entered, files for which is_file_ignored(relative_path) is true are
+    skipped, and symlinks are not followed. Both callbacks get the
+    "/"-separated path relative to the directory being walked, so the
+    directory's own location never affects ignore matching. Yielded paths are
+    joined onto each directory as given, with a leading "./" dropped.
+    """
+    frontier = []
+    for directory in directories:
+        base = os.path.normpath(directory)
+        frontier.append(("" if base == "." else base, ""))
+    
+    def scan(item: Tuple[str, str]) -> Tuple[List[Tuple[str, os.DirEntry]], List[Tuple[str, str]]]:
+        return _scan_dir(item[0], item[1], is_dir_ignored, is_file_ignored, recursive, include_hidden)
+    
+    while frontier:
+        # A single directory is not worth a round trip through the pool
+        if len(frontier) == 1:
+            levels = [scan(frontier[0])]
+        else:
+            levels = _get_walk_pool().map(scan, frontier)
+        
+        frontier = []
+        for files, subdirs in levels:
+            yield from files
+            frontier.extend(subdirs)
@@ -19,8 +19,8 @@ from pydantic import BaseModel, Field
 sys.path.append(str(Path(__file__).parent))
 
 from core.analyzer import CodeAnalyzer
-from config.settings import Settings
-from utils.safety import PathValidator
+from config.settings import Settings, get_settings
+from utils.safety import PathValidator, get_path_validator
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -74,10 +74,10 @@ async def initialize_server():
     
     try:
         # Load settings
-        settings = Settings()
+        settings = get_settings()
         
         # Initialize path validator
-        path_validator = PathValidator(settings.repositories.roots)
+        path_validator = get_path_validator(settings.repositories.roots)
         
         # Initialize analyzer
         analyzer = CodeAnalyzer(settings)
@@ -6,214 +6,600 @@ A basic MCP server to test the setup and functionality.
 """
 
 import asyncio
+import codecs
+import collections
+import contextlib
+import functools
+import itertools
 import json
+import mmap
+import os
+import re
 import sys
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
+# Optional: faster JSON encoding; the server runs on the stdlib alone
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize MCP server
 server = Server("codecompass")
 
-@server.list_tools()
-async def list_tools() -> List[Tool]:
-    """List available tools."""
+# TODO markers fused into one bytes pattern, run once over a whole file. The
+# separator excludes line breaks, and the text starts past the separator and
+# runs to the line break, so every hit stays on one line, each line yields at
+# most one hit and a bare marker (even before a CRLF) yields no empty item
+TODO_RE = re.compile(rb'(TODO|FIXME|HACK|NOTE|XXX|BUG)[:\t\x0b\x0c ]*([^\s:][^\r\n]*)', re.IGNORECASE)
+
+# Directories never worth descending into when scanning sources
+IGNORED_DIRS = frozenset({
+    '.git', 'node_modules', '.venv', 'venv', '__pycache__', 'dist', 'build'
+})
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed.
+    
+    Without an indent the output is compact, with no spaces after separators.
+    orjson only supports two-space indentation, so other indents fall back to
+    the standard library encoder.
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent == 2 else 0
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    
+    separators = (",", ":") if indent is None else None
+    return json.dumps(obj, indent=indent, separators=separators)
+
+def iter_py_files(root: str, ignore: frozenset = IGNORED_DIRS) -> Iterator[str]:
+    """Yield paths of .py files under root, pruning ignored and hidden directories.
+    
+    Uses an explicit stack of os.scandir() calls; file type checks come from
+    the directory listing, so no extra stat is needed per entry.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in ignore:
+                            stack.append(entry.path)
+                    elif name.endswith('.py') and entry.is_file():
+                        yield entry.path
+        except OSError:
+            continue
+
+def read_bytes(path: str) -> bytes:
+    """Read a whole file with os.open/os.read in as few syscalls as possible."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # One read normally covers the whole file; loop for growth/short reads
+            chunk = os.read(fd, max(size, 65536))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+# Files above this size are memory-mapped rather than read into memory
+MMAP_THRESHOLD = 64 * 1024
+
+@contextlib.contextmanager
+def open_contents(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Yield a file's contents, memory-mapped when larger than MMAP_THRESHOLD."""
+    if os.path.getsize(path) <= MMAP_THRESHOLD:
+        yield read_bytes(path)
+        return
+    
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Some file systems and platforms refuse the mapping; read instead
+            mapped = None
+        
+        if mapped is None:
+            yield f.read()
+        else:
+            with mapped:
+                yield mapped
+
+# read_file content is returned in text items of at most this many bytes
+READ_CHUNK_SIZE = 64 * 1024
+
+def iter_text_chunks(data: Union[bytes, memoryview], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """Decode data as UTF-8 in chunk_size pieces, never splitting a character."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with memoryview(data) as view:
+        for start in range(0, len(view), chunk_size):
+            text = decoder.decode(view[start:start + chunk_size])
+            if text:
+                yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def count_newlines(data: Union[bytes, mmap.mmap], start: int, end: int) -> int:
+    """Count newlines in data[start:end]; mmap has no count(), so it counts a slice."""
+    if isinstance(data, bytes):
+        return data.count(b"\n", start, end)
+    return data[start:end].count(b"\n")
+
+def compile_query(query: str, regex: bool, case_sensitive: bool) -> Tuple[Union[bytes, str], Optional[Pattern]]:
+    """Compile a query once per request as (needle, pattern).
+    
+    Only literal queries that need no Unicode case folding are encoded to
+    bytes, for iter_matching_lines. Regexes stay str, since character
+    classes, word and space escapes and dots only see single bytes in a bytes
+    pattern, and so do case-insensitive queries with non-ASCII characters, as
+    bytes.lower() only folds ASCII; both go to iter_matching_text_lines.
+    Raises re.error for an invalid regex.
+    """
+    if regex:
+        return query, re.compile(query, 0 if case_sensitive else re.IGNORECASE)
+    
+    if not case_sensitive and not query.isascii():
+        return query.lower(), None
+    
+    return (query if case_sensitive else query.lower()).encode('utf-8'), None
+
+def iter_matching_lines(
+    data: Union[bytes, mmap.mmap],
+    needle: bytes = b"",
+    pattern: Optional[Pattern[bytes]] = None,
+    ignore_case: bool = True
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield (line_number, line) for each line of data matching the query.
+    
+    Without a pattern, needle is found in data as is, or with ignore_case in a
+    lower-cased copy of data (ASCII case folding; needle must then already be
+    lower-cased). With a compiled bytes pattern, each hit
+    must lie within a single line, as with a line-by-line search. data may
+    also be an mmap.
+    """
+    size = len(data)
+    
+    if pattern is None:
+        haystack = data.lower() if ignore_case else data
+        
+        def find(pos: int) -> int:
+            return haystack.find(needle, pos)
+    else:
+        search = pattern.search
+        
+        def find(pos: int) -> int:
+            while True:
+                match = search(data, pos)
+                if match is None:
+                    return -1
+                start = match.start()
+                line_end = data.find(b"\n", start)
+                if line_end == -1:
+                    line_end = size
+                # Retry a hit that spans lines within its own line
+                if match.end() <= line_end or search(data, data.rfind(b"\n", 0, start) + 1, line_end):
+                    return start
+                pos = line_end + 1
+    
+    line_num = 1
+    counted = 0
+    pos = 0
+    
+    while pos <= size:
+        start = find(pos)
+        if start == -1:
+            break
+        
+        # Advance the line number incrementally from the previous hit
+        line_num += count_newlines(data, counted, start)
+        counted = start
+        
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end == -1:
+            line_end = size
+        
+        yield line_num, data[line_start:line_end]
+        
+        # At most one result per line
+        pos = line_end + 1
+
+def iter_matching_text_lines(
+    text: str,
+    needle: str = "",
+    pattern: Optional[Pattern[str]] = None
+) -> Iterator[Tuple[int, str]]:
+    """Yield (line_number, line) for each line of text matching the query.
+    
+    The str counterpart of iter_matching_lines for regexes and for
+    case-insensitive queries with non-ASCII characters: pattern is searched
+    within each line, or needle (already lower-cased) is found in each
+    lower-cased line.
+    """
+    for line_num, line in enumerate(text.split('\n'), 1):
+        if pattern.search(line) if pattern is not None else needle in line.lower():
+            yield line_num, line
+
+# Files in flight on the thread pool at once; results are kept in walk order
+SCAN_BATCH_SIZE = 64
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for per-file scans."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=min(32, (os.cpu_count() or 1) * 4),
+            thread_name_prefix="codecompass-scan"
+        )
+    return _executor
+
+async def scan_files(
+    paths: Iterable[str],
+    scan: Callable[[str], List[Dict[str, Any]]],
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Run scan(path) for each file on the thread pool, off the event loop.
+    
+    paths is consumed lazily with at most SCAN_BATCH_SIZE scans in flight.
+    Once limit results have been collected the walk stops, queued scans are
+    cancelled and scans not yet started return nothing.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    done = threading.Event()
+    
+    def scan_one(file_path: str) -> List[Dict[str, Any]]:
+        if done.is_set():
+            return []
+        return scan(file_path)
+    
+    pending = collections.deque()
+    results = []
+    
+    try:
+        for file_path in paths:
+            pending.append(loop.run_in_executor(executor, scan_one, file_path))
+            if len(pending) < SCAN_BATCH_SIZE:
+                continue
+            
+            # Collect in submission order so results match the walk order
+            results.extend(await pending.popleft())
+            if limit is not None and len(results) >= limit:
+                return results[:limit]
+        
+        while pending:
+            results.extend(await pending.popleft())
+            if limit is not None and len(results) >= limit:
+                return results[:limit]
+        
+        return results
+    finally:
+        done.set()
+        for future in pending:
+            future.cancel()
+
+@functools.lru_cache(maxsize=4096)
+def _search_file_cached(
+    file_path: str,
+    mtime_ns: int,
+    size: int,
+    needle: Union[bytes, str],
+    pattern: Optional[Pattern],
+    case_sensitive: bool,
+    limit: int
+) -> Tuple[Tuple[int, str], ...]:
+    """The first limit (line, snippet) hits for one file.
+    
+    mtime_ns and size only key the cache. The scan stops at limit hits, so a
+    cached entry never holds more than one request can return.
+    """
+    with open_contents(file_path) as data:
+        # Regexes and non-ASCII case-insensitive queries are matched on text
+        if isinstance(needle, str):
+            return tuple(
+                (line_num, line.strip())
+                for line_num, line in itertools.islice(
+                    iter_matching_text_lines(str(data, 'utf-8', 'replace'), needle, pattern), limit
+                )
+            )
+        
+        # A mapped file is searched in place rather than through a lower-cased copy
+        if pattern is None and not case_sensitive and not isinstance(data, bytes):
+            pattern = re.compile(re.escape(needle), re.IGNORECASE)
+        return tuple(
+            (line_num, line.decode('utf-8', errors='replace').strip())
+            for line_num, line in itertools.islice(
+                iter_matching_lines(data, needle, pattern, not case_sensitive), limit
+            )
+        )
+
+# Files with more TODOs than this are rescanned rather than cached
+TODO_CACHE_MAX_ITEMS = 64
+
+def iter_todos(file_path: str) -> Iterator[Tuple[int, str, str]]:
+    """Yield (line, text, snippet) for each TODO in one file."""
+    line_num = 1
+    counted = 0
+    
+    with open_contents(file_path) as data:
+        for match in TODO_RE.finditer(data):
+            # Advance the line number incrementally from the previous hit
+            start = match.start()
+            line_num += count_newlines(data, counted, start)
+            counted = start
+            
+            # The match ends at the end of its line; only that line is decoded
+            line_start = data.rfind(b"\n", 0, start) + 1
+            yield (
+                line_num,
+                match.group(2).decode('utf-8', errors='replace').strip(),
+                data[line_start:match.end()].decode('utf-8', errors='replace').strip()
+            )
+
+@functools.lru_cache(maxsize=4096)
+def _find_todos_cached(file_path: str, mtime_ns: int, size: int) -> Optional[Tuple[Tuple[int, str, str], ...]]:
+    """TODOs for one file, or None if it has more than TODO_CACHE_MAX_ITEMS.
+    
+    mtime_ns and size only key the cache.
+    """
+    with contextlib.closing(iter_todos(file_path)) as todos:
+        cached = tuple(itertools.islice(todos, TODO_CACHE_MAX_ITEMS + 1))
+    return cached if len(cached) <= TODO_CACHE_MAX_ITEMS else None
+
+def search_file(
+    file_path: str,
+    needle: Union[bytes, str],
+    pattern: Optional[Pattern],
+    case_sensitive: bool,
+    limit: int
+) -> List[Dict[str, Any]]:
+    """Return up to limit search hits in one file; unreadable files yield none."""
+    try:
+        st = os.stat(file_path)
+        hits = _search_file_cached(file_path, st.st_mtime_ns, st.st_size, needle, pattern, case_sensitive, limit)
+    except Exception:
+        return []
+    
     return [
-        Tool(
-            name="search_code",
-            description="Search for code using text or regex patterns",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search query"
-                    },
-                    "regex": {
-                        "type": "boolean",
-                        "description": "Use regex search",
-                        "default": False
-                    },
-                    "path_prefix": {
-                        "type": "string",
-                        "description": "Limit search to path prefix",
-                        "default": ""
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of results",
-                        "default": 50
-                    }
+        {"path": file_path, "line": line_num, "snippet": snippet}
+        for line_num, snippet in hits
+    ]
+
+def find_todos_in_file(file_path: str) -> List[Dict[str, Any]]:
+    """Return TODO items in one file; unreadable files yield none."""
+    try:
+        st = os.stat(file_path)
+        todos = _find_todos_cached(file_path, st.st_mtime_ns, st.st_size)
+        if todos is None:
+            todos = list(iter_todos(file_path))
+    except Exception:
+        return []
+    
+    return [
+        {"path": file_path, "line": line_num, "text": text, "snippet": snippet}
+        for line_num, text, snippet in todos
+    ]
+
+# Tool descriptors, built and validated once at import
+TOOLS: List[Tool] = [
+    Tool(
+        name="search_code",
+        description="Search for code using text or regex patterns",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query"
                 },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="read_file",
-            description="Read file contents with pagination",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {
-                        "type": "string",
-                        "description": "File path to read"
-                    },
-                    "offset": {
-                        "type": "integer",
-                        "description": "Byte offset to start reading",
-                        "default": 0
-                    },
-                    "length": {
-                        "type": "integer",
-                        "description": "Number of bytes to read",
-                        "default": 2000
-                    }
+                "regex": {
+                    "type": "boolean",
+                    "description": "Use regex search",
+                    "default": False
                 },
-                "required": ["path"]
-            }
-        ),
-        Tool(
-            name="list_todos",
-            description="List TODO/FIXME comments in the codebase",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path_prefix": {
-                        "type": "string",
-                        "description": "Limit search to path prefix",
-                        "default": ""
-                    }
+                "case_sensitive": {
+                    "type": "boolean",
+                    "description": "Match case exactly",
+                    "default": False
+                },
+                "path_prefix": {
+                    "type": "string",
+                    "description": "Limit search to path prefix",
+                    "default": ""
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results",
+                    "default": 50
+                },
+                "pretty": {
+                    "type": "boolean",
+                    "description": "Pretty-print the JSON response",
+                    "default": False
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="read_file",
+        description="Read file contents with pagination",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "File path to read"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Byte offset to start reading",
+                    "default": 0
+                },
+                "length": {
+                    "type": "integer",
+                    "description": "Number of bytes to read",
+                    "default": 2000
+                },
+                "pretty": {
+                    "type": "boolean",
+                    "description": "Pretty-print the JSON response",
+                    "default": False
+                }
+            },
+            "required": ["path"]
+        }
+    ),
+    Tool(
+        name="list_todos",
+        description="List TODO/FIXME comments in the codebase",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path_prefix": {
+                    "type": "string",
+                    "description": "Limit search to path prefix",
+                    "default": ""
+                },
+                "pretty": {
+                    "type": "boolean",
+                    "description": "Pretty-print the JSON response",
+                    "default": False
                 }
             }
+        }
+    )
+]
+
+@server.list_tools()
+async def list_tools() -> List[Tool]:
+    """List available tools."""
+    # A fresh list of the shared descriptors, so callers cannot mutate TOOLS
+    return list(TOOLS)
+
+async def search_code(arguments: Dict[str, Any], indent: Optional[int]) -> List[TextContent]:
+    """Handle the search_code tool."""
+    query = arguments.get("query", "")
+    regex = arguments.get("regex", False)
+    case_sensitive = arguments.get("case_sensitive", False)
+    path_prefix = arguments.get("path_prefix", "")
+    limit = arguments.get("limit", 50)
+    
+    # Simple search implementation
+    results = []
+    try:
+        # Encode/compile the query once; an invalid regex is reported
+        # here rather than skipped per file
+        needle, pattern = compile_query(query, regex, case_sensitive)
+        
+        # Search in current directory
+        search_path = path_prefix if path_prefix else "."
+        
+        results = await scan_files(
+            iter_py_files(search_path),
+            lambda file_path: search_file(file_path, needle, pattern, case_sensitive, limit),
+            limit
         )
-    ]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Search error: {e}")]
+    
+    return [TextContent(type="text", text=dumps({
+        "items": results,
+        "total": len(results),
+        "query": query
+    }, indent=indent))]
+
+async def read_file(arguments: Dict[str, Any], indent: Optional[int]) -> List[TextContent]:
+    """Handle the read_file tool."""
+    path = arguments.get("path", "")
+    offset = arguments.get("offset", 0)
+    length = arguments.get("length", 2000)
+    
+    try:
+        # Read only the requested byte window; large files are decoded
+        # straight from a view of a mapping served by the page cache, so
+        # the window is never copied into an intermediate bytes object
+        total_bytes = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            if total_bytes > MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view, view[offset:offset + length] as window:
+                        data_length = len(window)
+                        texts = list(iter_text_chunks(window))
+            else:
+                f.seek(offset)
+                data = f.read(length)
+                data_length = len(data)
+                texts = list(iter_text_chunks(data))
+        
+        # Metadata first, then the raw content as plain text items (no
+        # JSON escaping); large windows are split into several pieces
+        chunks = [
+            TextContent(type="text", text=text)
+            for text in texts
+        ] or [TextContent(type="text", text="")]
+        return [TextContent(type="text", text=dumps({
+            "total_bytes": total_bytes,
+            "offset": offset,
+            "length": data_length,
+            "chunks": len(chunks)
+        }, indent=indent))] + chunks
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"Read file error: {e}")]
+
+async def list_todos(arguments: Dict[str, Any], indent: Optional[int]) -> List[TextContent]:
+    """Handle the list_todos tool."""
+    path_prefix = arguments.get("path_prefix", "")
+    
+    try:
+        search_path = path_prefix if path_prefix else "."
+        todos = await scan_files(iter_py_files(search_path), find_todos_in_file)
+        
+        return [TextContent(type="text", text=dumps({
+            "items": todos,
+            "total": len(todos)
+        }, indent=indent))]
+        
+    except Exception as e:
+        return [TextContent(type="text", text=f"TODO search error: {e}")]
+
+# Tool name -> handler, built once at import
+TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any], Optional[int]], Awaitable[List[TextContent]]]] = {
+    "search_code": search_code,
+    "read_file": read_file,
+    "list_todos": list_todos,
+}
 
 @server.call_tool()
 async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """Handle tool calls."""
     try:
-        if name == "search_code":
-            query = arguments.get("query", "")
-            regex = arguments.get("regex", False)
-            path_prefix = arguments.get("path_prefix", "")
-            limit = arguments.get("limit", 50)
-            
-            # Simple search implementation
-            results = []
-            try:
-                import os
-                import glob
-                
-                # Search in current directory
-                search_path = path_prefix if path_prefix else "."
-                pattern = f"{search_path}/**/*.py"
-                
-                for file_path in glob.glob(pattern, recursive=True):
-                    if len(results) >= limit:
-                        break
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            lines = content.split('\n')
-                            
-                            for line_num, line in enumerate(lines, 1):
-                                if query.lower() in line.lower():
-                                    results.append({
-                                        "path": file_path,
-                                        "line": line_num,
-                                        "snippet": line.strip()
-                                    })
-                                    if len(results) >= limit:
-                                        break
-                    except Exception:
-                        continue
-                        
-            except Exception as e:
-                return [TextContent(type="text", text=f"Search error: {e}")]
-            
-            return [TextContent(type="text", text=json.dumps({
-                "items": results,
-                "total": len(results),
-                "query": query
-            }, indent=2))]
-        
-        elif name == "read_file":
-            path = arguments.get("path", "")
-            offset = arguments.get("offset", 0)
-            length = arguments.get("length", 2000)
-            
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    total_bytes = len(content.encode('utf-8'))
-                    
-                    # Apply pagination
-                    if offset > 0 or length < len(content):
-                        content = content[offset:offset + length]
-                    
-                    return [TextContent(type="text", text=json.dumps({
-                        "content": content,
-                        "total_bytes": total_bytes,
-                        "offset": offset,
-                        "length": len(content)
-                    }, indent=2))]
-                    
-            except Exception as e:
-                return [TextContent(type="text", text=f"Read file error: {e}")]
-        
-        elif name == "list_todos":
-            path_prefix = arguments.get("path_prefix", "")
-            
-            try:
-                import os
-                import glob
-                import re
-                
-                todos = []
-                search_path = path_prefix if path_prefix else "."
-                pattern = f"{search_path}/**/*.py"
-                
-                todo_patterns = [
-                    r'TODO[:\s]*(.+)',
-                    r'FIXME[:\s]*(.+)',
-                    r'HACK[:\s]*(.+)',
-                    r'NOTE[:\s]*(.+)',
-                    r'XXX[:\s]*(.+)',
-                    r'BUG[:\s]*(.+)'
-                ]
-                
-                for file_path in glob.glob(pattern, recursive=True):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            lines = content.split('\n')
-                            
-                            for line_num, line in enumerate(lines, 1):
-                                for pattern in todo_patterns:
-                                    match = re.search(pattern, line, re.IGNORECASE)
-                                    if match:
-                                        todos.append({
-                                            "path": file_path,
-                                            "line": line_num,
-                                            "text": match.group(1).strip(),
-                                            "snippet": line.strip()
-                                        })
-                    except Exception:
-                        continue
-                
-                return [TextContent(type="text", text=json.dumps({
-                    "items": todos,
-                    "total": len(todos)
-                }, indent=2))]
-                
-            except Exception as e:
-                return [TextContent(type="text", text=f"TODO search error: {e}")]
-        
-        else:
+        handler = TOOL_HANDLERS.get(name)
+        if handler is None:
             return [TextContent(type="text", text=f"Unknown tool: {name}")]
+        
+        # Responses are compact JSON unless a readable form is asked for
+        indent = 2 if arguments.get("pretty", False) else None
+        return await handler(arguments, indent)
             
     except Exception as e:
         return [TextContent(type="text", text=f"Tool execution error: {e}")]
@@ -7,7 +7,9 @@ Web interface for the CodeCompass MCP server.
 
 import streamlit as st
 import asyncio
+import atexit
 import sys
+import threading
 from pathlib import Path
 from typing import Dict, List, Any
 import json
@@ -36,17 +38,49 @@ if "path_validator" not in st.session_state:
     st.session_state.path_validator = None
 
 
+@st.cache_resource
+def get_components():
+    """Build settings, path validator and analyzer once per process."""
+    settings = Settings()
+    return settings, PathValidator(settings.repositories.roots), CodeAnalyzer(settings)
+
+
+@st.cache_resource
+def get_event_loop():
+    """Start the event loop shared by all sessions, on its own thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="codecompass-loop", daemon=True)
+    thread.start()
+    
+    def shutdown():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+    
+    # Stop and close the loop when the server process exits
+    atexit.register(shutdown)
+    return loop
+
+
 def initialize_components():
     """Initialize the analyzer and other components."""
     try:
-        if not st.session_state.analyzer:
-            st.session_state.settings = Settings()
-            st.session_state.path_validator = PathValidator(st.session_state.settings.repositories.roots)
-            st.session_state.analyzer = CodeAnalyzer(st.session_state.settings)
+        # Shared by all sessions and reruns
+        (
+            st.session_state.settings,
+            st.session_state.path_validator,
+            st.session_state.analyzer
+        ) = get_components()
     except Exception as e:
         st.error(f"Failed to initialize: {e}")
 
 
+def run_async(coro):
+    """Run a coroutine to completion on the shared event loop."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
 def search_page():
     """Code search page."""
     st.header("🔍 Code Search")
@@ -75,7 +109,7 @@ def search_page():
             with st.spinner("Searching..."):
                 try:
                     # Perform search
-                    results = asyncio.run(st.session_state.analyzer.search_code(
+                    results = run_async(st.session_state.analyzer.search_code(
                         query=query,
                         regex=(search_type == "Regex"),
                         case_sensitive=case_sensitive,
@@ -127,7 +161,7 @@ def file_explorer_page():
                 with st.spinner("Analyzing..."):
                     try:
                         # Analyze the file
-                        analysis = asyncio.run(st.session_state.analyzer.explain_range(
+                        analysis = run_async(st.session_state.analyzer.explain_range(
                             path=uploaded_file.name,
                             start_line=1,
                             end_line=len(content.split('\n')),
@@ -156,7 +190,7 @@ def analysis_page():
                 with st.spinner("Analyzing..."):
                     try:
                         # Analyze the code
-                        analysis = asyncio.run(st.session_state.analyzer.explain_range(
+                        analysis = run_async(st.session_state.analyzer.explain_range(
                             path="input.py",
                             start_line=1,
                             end_line=len(code_input.split('\n')),
@@ -212,7 +246,7 @@ def todos_page():
     if st.button("Find TODOs", type="primary"):
         with st.spinner("Searching for TODOs..."):
             try:
-                todos = asyncio.run(st.session_state.analyzer.list_todos(path_prefix=path_prefix))
+                todos = run_async(st.session_state.analyzer.list_todos(path_prefix=path_prefix))
                 
                 if todos:
                     st.success(f"Found {len(todos)} TODO items")
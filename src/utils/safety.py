@@ -2,11 +2,18 @@
 Safety utilities for path validation and sandboxing.
 """
 
+import bisect
+import functools
 import os
 from pathlib import Path
-from typing import List, Set
+from typing import Iterable, List, Optional, Set, Tuple
 from loguru import logger
 
+# Directories list_safe_files does not descend into by default (VCS metadata
+# and dependency/cache trees)
+DEFAULT_IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "__pycache__", "node_modules"
+})
 
 class PathValidator:
     """Path validation and sandboxing utilities."""
@@ -14,6 +21,7 @@ class PathValidator:
     def __init__(self, allowed_roots: List[str]):
         self.allowed_roots = [Path(root).resolve() for root in allowed_roots]
         self._validate_roots()
+        self._rebuild_root_index()
         
         logger.info(f"PathValidator initialized with roots: {self.allowed_roots}")
     
@@ -39,23 +47,36 @@ class PathValidator:
             self.allowed_roots = [Path.cwd()]
             logger.warning("No valid roots found, using current directory")
     
+    def _rebuild_root_index(self) -> None:
+        """Rebuild the sorted root prefixes used by _is_within_allowed_roots.
+        
+        Roots nested inside another root are dropped, which leaves a prefix-free
+        sorted list: the only root that can contain a path is then its
+        predecessor in sort order.
+        """
+        prefixes = []
+        for prefix in sorted(self._root_prefix(os.path.realpath(root)) for root in self.allowed_roots):
+            if not (prefixes and prefix.startswith(prefixes[-1])):
+                prefixes.append(prefix)
+        self._root_prefixes = tuple(prefixes)
+    
+    @staticmethod
+    def _root_prefix(path: str) -> str:
+        """Normalized string prefix for a resolved path, ending in a separator."""
+        prefix = os.path.normcase(path)
+        return prefix if prefix.endswith(os.sep) else prefix + os.sep
+    
     def is_safe_path(self, path: str) -> bool:
         """Check if a path is safe to access."""
         try:
-            path_obj = Path(path).resolve()
-            
-            # Check for path traversal attempts
-            if self._has_path_traversal(path):
-                logger.warning(f"Path traversal detected: {path}")
-                return False
-            
-            # Check if path is within allowed roots
-            if not self._is_within_allowed_roots(path_obj):
-                logger.warning(f"Path outside allowed roots: {path}")
+            # Resolved on every call: a cached verdict would go stale when a
+            # symlink is retargeted or the working directory changes
+            real_path = self._check_path(path)
+            if real_path is None:
                 return False
             
             # Check if path exists
-            if not path_obj.exists():
+            if not os.path.exists(real_path):
                 logger.warning(f"Path does not exist: {path}")
                 return False
             
@@ -65,50 +86,41 @@ class PathValidator:
             logger.error(f"Error validating path {path}: {e}")
             return False
     
-    def _has_path_traversal(self, path: str) -> bool:
-        """Check for path traversal patterns."""
-        # Check for common path traversal patterns
-        dangerous_patterns = [
-            "..",
-            "../",
-            "..\\",
-            "..%2f",
-            "..%5c",
-            "..%252f",
-            "..%255c"
-        ]
+    def _check_path(self, path: str) -> Optional[str]:
+        """Resolve path and apply traversal/root checks, returning None if unsafe."""
+        # Check for path traversal attempts (string-level, before any syscalls)
+        if self._has_path_traversal(path):
+            logger.warning(f"Path traversal detected: {path}")
+            return None
         
-        path_lower = path.lower()
-        for pattern in dangerous_patterns:
-            if pattern in path_lower:
-                return True
+        # Resolve once with os.path.realpath (no Path objects); absolute and
+        # relative paths share the root check below
+        real_path = os.path.realpath(path)
         
-        # Check for absolute paths that might escape
-        if os.path.isabs(path):
-            # Allow absolute paths only if they're within allowed roots
-            path_obj = Path(path).resolve()
-            if not self._is_within_allowed_roots(path_obj):
-                return True
+        # Check if path is within allowed roots
+        if not self._is_within_allowed_roots(real_path):
+            logger.warning(f"Path outside allowed roots: {path}")
+            return None
         
+        return real_path
+    
+    def _has_path_traversal(self, path: str) -> bool:
+        """Check for path traversal patterns."""
+        # Every pattern we guard against ("..", "../", "..\\", and the
+        # URL-encoded "..%2f", "..%5c", "..%252f", "..%255c") contains "..", so
+        # one substring test (no lower-casing needed) covers them all
+        if ".." in path:
+            return True
+        
+        # Absolute paths are not traversal by themselves; whether they escape
+        # the allowed roots is checked on the resolved path by the caller
         return False
     
-    def _is_within_allowed_roots(self, path: Path) -> bool:
+    def _is_within_allowed_roots(self, path: str) -> bool:
         """Check if path is within any of the allowed roots."""
-        try:
-            for root in self.allowed_roots:
-                try:
-                    # Check if path is within this root
-                    path.relative_to(root)
-                    return True
-                except ValueError:
-                    # Path is not relative to this root, try next
-                    continue
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error checking path within roots: {e}")
-            return False
+        prefix = self._root_prefix(path)
+        index = bisect.bisect_right(self._root_prefixes, prefix) - 1
+        return index >= 0 and prefix.startswith(self._root_prefixes[index])
     
     def sanitize_path(self, path: str) -> str:
         """Sanitize a path by removing dangerous elements."""
@@ -143,30 +155,58 @@ class PathValidator:
         else:
             return self.sanitize_path(path)
     
-    def list_safe_files(self, directory: str, recursive: bool = True) -> List[str]:
-        """List files in a directory, ensuring all paths are safe."""
+    def list_safe_files(
+        self,
+        directory: str,
+        recursive: bool = True,
+        ignored_dirs: Iterable[str] = DEFAULT_IGNORED_DIRS
+    ) -> List[str]:
+        """List files in a directory, ensuring all paths are safe.
+        
+        Only the directory itself is validated up front. Entries reached
+        through it without following a symlink stay inside the allowed roots,
+        so only symlinks get the full is_safe_path check; symlinked
+        directories are not descended into. Subdirectories named in
+        ignored_dirs are pruned without being listed.
+        """
         try:
             if not self.is_safe_path(directory):
                 logger.warning(f"Unsafe directory: {directory}")
                 return []
             
-            dir_path = Path(directory)
-            safe_files = []
+            ignored_dirs = frozenset(ignored_dirs)
             
-            if recursive:
-                pattern = "**/*"
-            else:
-                pattern = "*"
-            
-            for file_path in dir_path.glob(pattern):
-                if file_path.is_file() and self.is_safe_path(str(file_path)):
-                    safe_files.append(str(file_path))
-            
-            return safe_files
+            # Paths are joined as pathlib would ("." contributes no prefix)
+            root = str(Path(directory))
             
         except Exception as e:
             logger.error(f"Error listing safe files in {directory}: {e}")
             return []
+        
+        safe_files = []
+        stack = ["" if root == "." else root]
+        
+        while stack:
+            current = stack.pop()
+            
+            # An unreadable or vanished directory is skipped, not fatal
+            try:
+                with os.scandir(current or ".") as entries:
+                    for entry in entries:
+                        entry_path = os.path.join(current, entry.name)
+                        if entry.is_symlink():
+                            if entry.is_file() and self.is_safe_path(entry_path):
+                                safe_files.append(entry_path)
+                        elif entry.is_dir(follow_symlinks=False):
+                            if recursive and entry.name not in ignored_dirs:
+                                stack.append(entry_path)
+                        elif entry.is_file(follow_symlinks=False):
+                            safe_files.append(entry_path)
+            except OSError as e:
+                logger.warning(f"Cannot scan directory {current or '.'}: {e}")
+                continue
+        
+        return safe_files
     
     def get_allowed_roots(self) -> List[str]:
         """Get list of allowed root paths."""
@@ -180,6 +220,7 @@ class PathValidator:
             if root_path.exists() and root_path.is_dir():
                 if root_path not in self.allowed_roots:
                     self.allowed_roots.append(root_path)
+                    self._rebuild_root_index()
                     logger.info(f"Added allowed root: {root_path}")
                     return True
                 else:
@@ -200,6 +241,7 @@ class PathValidator:
             
             if root_path in self.allowed_roots:
                 self.allowed_roots.remove(root_path)
+                self._rebuild_root_index()
                 logger.info(f"Removed allowed root: {root_path}")
                 return True
             else:
@@ -209,3 +251,19 @@ class PathValidator:
         except Exception as e:
             logger.error(f"Error removing allowed root {root}: {e}")
             return False
+
+
+@functools.lru_cache(maxsize=16)
+def _shared_path_validator(roots: Tuple[str, ...]) -> PathValidator:
+    """Build the shared PathValidator for one tuple of roots."""
+    return PathValidator(list(roots))
+
+
+def get_path_validator(roots: Iterable[str]) -> PathValidator:
+    """Return a PathValidator shared by all callers with the same roots.
+    
+    Roots are validated once per distinct list. Adding or removing roots on
+    the returned validator affects every caller; build a PathValidator
+    directly for a private one.
+    """
+    return _shared_path_validator(tuple(roots))
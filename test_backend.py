@@ -7,184 +7,216 @@ and tests the backend functionality.
 """
 
 import asyncio
+import io
 import sys
 import json
 from pathlib import Path
 
-# Add src to path
-sys.path.append('src')
+# Make src importable when run as a script; pytest sets it via pythonpath
+if __name__ == "__main__" and "src" not in sys.path:
+    sys.path.insert(0, "src")
 
 from simple_mcp_server import server, list_tools, call_tool
 from core.analyzer import CodeAnalyzer
-from config.settings import Settings
-from utils.safety import PathValidator
+from config.settings import get_settings
+from utils.safety import get_path_validator
 
-async def test_mcp_tools():
+async def test_mcp_tools(out=sys.stdout):
     """Test all MCP tools."""
-    print("🧭 Testing CodeCompass MCP Server Backend")
-    print("=" * 50)
+    print("🧭 Testing CodeCompass MCP Server Backend", file=out)
+    print("=" * 50, file=out)
     
     # Test 1: List available tools
-    print("\n1️⃣ Testing Tool Discovery")
-    print("-" * 30)
+    print("\n1️⃣ Testing Tool Discovery", file=out)
+    print("-" * 30, file=out)
     tools = await list_tools()
-    print(f"✅ Found {len(tools)} tools:")
+    print(f"✅ Found {len(tools)} tools:", file=out)
     for tool in tools:
-        print(f"   • {tool.name}: {tool.description}")
+        print(f"   • {tool.name}: {tool.description}", file=out)
     
-    # Test 2: Search Code
-    print("\n2️⃣ Testing Code Search")
-    print("-" * 30)
-    search_results = await call_tool("search_code", {
-        "query": "def ",
-        "limit": 5
-    })
-    print(f"✅ Search completed: {len(search_results)} results")
-    for i, result in enumerate(search_results[:3]):
-        print(f"   Result {i+1}: {result.text[:100]}...")
+    # Run the remaining tool calls concurrently, at most four at a time;
+    # results are reported in order
+    limit = asyncio.Semaphore(4)
     
-    # Test 3: Read File
-    print("\n3️⃣ Testing File Reading")
-    print("-" * 30)
-    try:
-        read_results = await call_tool("read_file", {
+    async def run(name, arguments):
+        # Tool errors are returned rather than raised, so one failing call
+        # does not cancel the others
+        async with limit:
+            try:
+                return await call_tool(name, arguments)
+            except Exception as e:
+                return e
+    
+    async with asyncio.TaskGroup() as tg:
+        search_task = tg.create_task(run("search_code", {
+            "query": "def ",
+            "limit": 5
+        }))
+        read_task = tg.create_task(run("read_file", {
             "path": "src/simple_mcp_server.py",
             "offset": 0,
             "length": 500
-        })
-        print(f"✅ File read successfully: {len(read_results)} results")
+        }))
+        todo_task = tg.create_task(run("list_todos", {
+            "path_prefix": "src/"
+        }))
+    
+    search_results, read_results, todo_results = (
+        search_task.result(), read_task.result(), todo_task.result()
+    )
+    for results in (search_results, todo_results):
+        if isinstance(results, BaseException):
+            raise results
+    
+    # Test 2: Search Code
+    print("\n2️⃣ Testing Code Search", file=out)
+    print("-" * 30, file=out)
+    print(f"✅ Search completed: {len(search_results)} results", file=out)
+    for i, result in enumerate(search_results[:3]):
+        print(f"   Result {i+1}: {result.text[:100]}...", file=out)
+    
+    # Test 3: Read File
+    print("\n3️⃣ Testing File Reading", file=out)
+    print("-" * 30, file=out)
+    if isinstance(read_results, Exception):
+        print(f"❌ File read failed: {read_results}", file=out)
+    else:
+        print(f"✅ File read successfully: {len(read_results)} results", file=out)
         for result in read_results:
             content = result.text
-            print(f"   Content length: {len(content)} characters")
-            print(f"   First 100 chars: {content[:100]}...")
-    except Exception as e:
-        print(f"❌ File read failed: {e}")
+            print(f"   Content length: {len(content)} characters", file=out)
+            print(f"   First 100 chars: {content[:100]}...", file=out)
     
     # Test 4: List TODOs
-    print("\n4️⃣ Testing TODO Detection")
-    print("-" * 30)
-    todo_results = await call_tool("list_todos", {
-        "path_prefix": "src/"
-    })
-    print(f"✅ TODO search completed: {len(todo_results)} results")
+    print("\n4️⃣ Testing TODO Detection", file=out)
+    print("-" * 30, file=out)
+    print(f"✅ TODO search completed: {len(todo_results)} results", file=out)
     for i, result in enumerate(todo_results[:3]):
-        print(f"   TODO {i+1}: {result.text[:100]}...")
+        print(f"   TODO {i+1}: {result.text[:100]}...", file=out)
 
-async def test_core_analyzer():
+async def test_core_analyzer(out=sys.stdout):
     """Test the core analyzer directly."""
-    print("\n🔬 Testing Core Analyzer")
-    print("=" * 50)
+    print("\n🔬 Testing Core Analyzer", file=out)
+    print("=" * 50, file=out)
     
     try:
         # Initialize components
-        settings = Settings()
-        path_validator = PathValidator(settings.repositories.roots)
+        settings = get_settings()
+        path_validator = get_path_validator(settings.repositories.roots)
         analyzer = CodeAnalyzer(settings)
         
-        print("✅ Core components initialized successfully")
+        print("✅ Core components initialized successfully", file=out)
         
         # Test search functionality
-        print("\n📊 Testing Search Engine")
-        print("-" * 30)
+        print("\n📊 Testing Search Engine", file=out)
+        print("-" * 30, file=out)
         search_results = await analyzer.search_code(
             query="import",
             limit=3
         )
-        print(f"✅ Search found {len(search_results)} results")
+        print(f"✅ Search found {len(search_results)} results", file=out)
         for i, result in enumerate(search_results):
-            print(f"   {i+1}. {result.get('path', 'Unknown')}:{result.get('line', '?')} - {result.get('snippet', '')[:50]}...")
+            print(f"   {i+1}. {result.get('path', 'Unknown')}:{result.get('line', '?')} - {result.get('snippet', '')[:50]}...", file=out)
         
         # Test file reading
-        print("\n📁 Testing File Operations")
-        print("-" * 30)
+        print("\n📁 Testing File Operations", file=out)
+        print("-" * 30, file=out)
         try:
             content, total_bytes = await analyzer.read_file(
                 path="src/simple_mcp_server.py",
                 offset=0,
                 length=200
             )
-            print(f"✅ File read: {len(content)} chars, {total_bytes} total bytes")
-            print(f"   Preview: {content[:100]}...")
+            print(f"✅ File read: {len(content)} chars, {total_bytes} total bytes", file=out)
+            print(f"   Preview: {content[:100]}...", file=out)
         except Exception as e:
-            print(f"❌ File read error: {e}")
+            print(f"❌ File read error: {e}", file=out)
         
         # Test TODO detection
-        print("\n📝 Testing TODO Detection")
-        print("-" * 30)
+        print("\n📝 Testing TODO Detection", file=out)
+        print("-" * 30, file=out)
         todos = await analyzer.list_todos(path_prefix="src/")
-        print(f"✅ Found {len(todos)} TODO items")
+        print(f"✅ Found {len(todos)} TODO items", file=out)
         for i, todo in enumerate(todos[:3]):
-            print(f"   {i+1}. {todo.get('path', 'Unknown')}:{todo.get('line', '?')} - {todo.get('text', '')[:50]}...")
+            print(f"   {i+1}. {todo.get('path', 'Unknown')}:{todo.get('line', '?')} - {todo.get('text', '')[:50]}...", file=out)
         
         # Test code explanation
-        print("\n🧠 Testing Code Explanation")
-        print("-" * 30)
+        print("\n🧠 Testing Code Explanation", file=out)
+        print("-" * 30, file=out)
         try:
             explanation = await analyzer.explain_range(
                 path="src/simple_mcp_server.py",
                 start_line=1,
                 end_line=20
             )
-            print("✅ Code explanation generated:")
-            print(f"   Summary: {explanation.get('summary', 'N/A')[:100]}...")
-            print(f"   Language: {explanation.get('language', 'Unknown')}")
-            print(f"   Patterns: {explanation.get('patterns', [])}")
-            print(f"   Risks: {explanation.get('risks', [])}")
-            print(f"   Suggestions: {explanation.get('suggestions', [])[:2]}")
+            print("✅ Code explanation generated:", file=out)
+            print(f"   Summary: {explanation.get('summary', 'N/A')[:100]}...", file=out)
+            print(f"   Language: {explanation.get('language', 'Unknown')}", file=out)
+            print(f"   Patterns: {explanation.get('patterns', [])}", file=out)
+            print(f"   Risks: {explanation.get('risks', [])}", file=out)
+            print(f"   Suggestions: {explanation.get('suggestions', [])[:2]}", file=out)
         except Exception as e:
-            print(f"❌ Code explanation error: {e}")
+            print(f"❌ Code explanation error: {e}", file=out)
             
     except Exception as e:
-        print(f"❌ Core analyzer test failed: {e}")
+        print(f"❌ Core analyzer test failed: {e}", file=out)
 
-def test_path_safety():
+def test_path_safety(out=sys.stdout):
     """Test path safety features."""
-    print("\n🔒 Testing Path Safety")
-    print("=" * 50)
+    print("\n🔒 Testing Path Safety", file=out)
+    print("=" * 50, file=out)
     
     try:
-        settings = Settings()
-        validator = PathValidator(settings.repositories.roots)
+        settings = get_settings()
+        validator = get_path_validator(settings.repositories.roots)
         
         # Test safe paths
         safe_paths = [".", "src/", "src/simple_mcp_server.py"]
         for path in safe_paths:
             is_safe = validator.is_safe_path(path)
-            print(f"✅ {path}: {'SAFE' if is_safe else 'UNSAFE'}")
+            print(f"✅ {path}: {'SAFE' if is_safe else 'UNSAFE'}", file=out)
         
         # Test unsafe paths
         unsafe_paths = ["../", "/etc/passwd", "../../../etc/shadow"]
         for path in unsafe_paths:
             is_safe = validator.is_safe_path(path)
-            print(f"❌ {path}: {'SAFE' if is_safe else 'UNSAFE'}")
+            print(f"❌ {path}: {'SAFE' if is_safe else 'UNSAFE'}", file=out)
             
     except Exception as e:
-        print(f"❌ Path safety test failed: {e}")
+        print(f"❌ Path safety test failed: {e}", file=out)
 
 async def main():
     """Run all backend tests."""
-    print("🚀 CodeCompass Backend Test Suite")
-    print("=" * 60)
-    
-    # Test MCP tools
-    await test_mcp_tools()
-    
-    # Test core analyzer
-    await test_core_analyzer()
-    
-    # Test path safety
-    test_path_safety()
-    
-    print("\n🎉 Backend Testing Complete!")
-    print("=" * 60)
-    print("✅ All core functionality is working")
-    print("✅ MCP server is ready for Claude Desktop")
-    print("✅ Streamlit dashboard is ready")
-    print("✅ Path safety is enforced")
-    print("\n🔗 Next steps:")
-    print("   1. Open http://localhost:8501 for the web dashboard")
-    print("   2. Use the MCP server with Claude Desktop")
-    print("   3. Deploy to Streamlit Cloud for sharing")
+    # All output is collected here and written in one go at the end
+    out = io.StringIO()
+    try:
+        print("🚀 CodeCompass Backend Test Suite", file=out)
+        print("=" * 60, file=out)
+        
+        # Test MCP tools and the core analyzer concurrently; each writes to its
+        # own buffer so their sections do not interleave
+        mcp_out = io.StringIO()
+        core_out = io.StringIO()
+        await asyncio.gather(test_mcp_tools(mcp_out), test_core_analyzer(core_out))
+        out.write(mcp_out.getvalue())
+        out.write(core_out.getvalue())
+        
+        # Test path safety
+        test_path_safety(out)
+        
+        print("\n🎉 Backend Testing Complete!", file=out)
+        print("=" * 60, file=out)
+        print("✅ All core functionality is working", file=out)
+        print("✅ MCP server is ready for Claude Desktop", file=out)
+        print("✅ Streamlit dashboard is ready", file=out)
+        print("✅ Path safety is enforced", file=out)
+        print("\n🔗 Next steps:", file=out)
+        print("   1. Open http://localhost:8501 for the web dashboard", file=out)
+        print("   2. Use the MCP server with Claude Desktop", file=out)
+        print("   3. Deploy to Streamlit Cloud for sharing", file=out)
+    finally:
+        sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,28 +2,35 @@
 Basic tests for CodeCompass
 """
 
+import importlib
+import os
 import pytest
-import sys
-from pathlib import Path
 
-# Add src to path
-sys.path.append(str(Path(__file__).parent.parent / "src"))
 
-
-def test_imports():
-    """Test that all modules can be imported."""
+@pytest.mark.parametrize("module_name, attr", [
+    ("core.analyzer", "CodeAnalyzer"),
+    ("config.settings", "Settings"),
+    ("utils.safety", "PathValidator"),
+    ("simple_mcp_server", "server"),
+])
+def test_imports(module_name, attr):
+    """Test that each module can be imported on its own."""
     try:
-        from core.analyzer import CodeAnalyzer
-        from config.settings import Settings
-        from utils.safety import PathValidator
-        from simple_mcp_server import server
-        # Test that imports work by checking they exist
-        assert CodeAnalyzer is not None
-        assert Settings is not None
-        assert PathValidator is not None
-        assert server is not None
+        module = importlib.import_module(module_name)
     except ImportError as e:
         pytest.fail(f"Import failed: {e}")
+    assert getattr(module, attr) is not None
+
+
+def test_mcp_server_import():
+    """Test that the main MCP server module imports."""
+    try:
+        module = importlib.import_module("mcp_server")
+    except AttributeError as e:
+        # Installed mcp SDKs without the Server.tool decorator cannot register
+        # the tools; anything else (e.g. a NameError) still fails the test
+        pytest.skip(f"mcp SDK API mismatch: {e}")
+    assert module.server is not None
 
 
 def test_simple_mcp_server():
@@ -37,11 +44,62 @@ def test_simple_mcp_server():
     assert list_tools is not None
 
 
+def test_simple_mcp_server_non_ascii_ignore_case(tmp_path, monkeypatch):
+    """Test case-insensitive search for queries with non-ASCII letters."""
+    import asyncio
+    import json
+    from simple_mcp_server import call_tool
+
+    (tmp_path / "a.py").write_text("x = 'ÄPFEL'\ny = 'apfel'\n")
+    monkeypatch.chdir(tmp_path)
+
+    response = asyncio.run(call_tool("search_code", {"query": "äpfel"}))
+    assert [item["line"] for item in json.loads(response[0].text)["items"]] == [1]
+
+
+def test_simple_mcp_server_regex_on_text(tmp_path, monkeypatch):
+    """Test that regex queries match characters rather than UTF-8 bytes."""
+    import asyncio
+    import json
+    from simple_mcp_server import call_tool
+
+    (tmp_path / "a.py").write_text("x = 'café'\ny = 'à'\n")
+    monkeypatch.chdir(tmp_path)
+
+    for query, lines in (("caf\\w'", [1]), ("'[é]'", [])):
+        response = asyncio.run(call_tool("search_code", {"query": query, "regex": True}))
+        assert [item["line"] for item in json.loads(response[0].text)["items"]] == lines
+
+
+def test_simple_mcp_server_caches_bounded(tmp_path):
+    """Test that per-file caches hold no more hits than a request returns."""
+    import simple_mcp_server as sms
+
+    path = tmp_path / "a.py"
+    path.write_text("# TODO: x\n" * (sms.TODO_CACHE_MAX_ITEMS + 1))
+    needle, pattern = sms.compile_query("todo", False, False)
+
+    assert len(sms.search_file(str(path), needle, pattern, False, 3)) == 3
+    st = path.stat()
+    assert len(sms._search_file_cached(str(path), st.st_mtime_ns, st.st_size, needle, pattern, False, 3)) == 3
+    assert len(sms.find_todos_in_file(str(path))) == sms.TODO_CACHE_MAX_ITEMS + 1
+    assert sms._find_todos_cached(str(path), st.st_mtime_ns, st.st_size) is None
+
+
+def test_simple_mcp_server_todos_crlf(tmp_path):
+    """Test that CRLF line endings yield no empty TODO items."""
+    import simple_mcp_server as sms
+
+    path = tmp_path / "a.py"
+    path.write_bytes(b"# TODO:\r\n# FIXME: fix this \r\n")
+    assert [(t["line"], t["text"]) for t in sms.find_todos_in_file(str(path))] == [(2, "fix this")]
+
 def test_settings():
     """Test settings loading."""
-    from config.settings import Settings
+    from config.settings import get_settings
 
-    settings = Settings()
+    settings = get_settings()
+    assert settings is get_settings()
     assert settings.server.name == "CodeCompass"
     assert settings.server.version == "1.0.0"
     assert isinstance(settings.repositories.ignore_patterns, list)
@@ -49,9 +107,339 @@ def test_settings():
 
 def test_path_validator():
     """Test path validator."""
-    from utils.safety import PathValidator
+    from utils.safety import get_path_validator
 
-    validator = PathValidator(["."])
+    validator = get_path_validator(["."])
+    assert validator is get_path_validator(["."])
     assert validator.is_safe_path(".")
     assert not validator.is_safe_path("../")
     assert not validator.is_safe_path("/etc/passwd")
+
+
+def test_path_validator_root_changes(tmp_path):
+    """Test that cached path checks follow allowed root changes."""
+    from utils.safety import PathValidator
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "a.py").write_text("x = 1\n")
+    target = str(other / "a.py")
+
+    validator = PathValidator([str(tmp_path / "missing")])
+    assert not validator.is_safe_path(target)
+    assert validator.add_allowed_root(str(other))
+    assert validator.is_safe_path(target)
+    assert validator.remove_allowed_root(str(other))
+    assert not validator.is_safe_path(target)
+
+
+def test_path_validator_symlink_retarget(tmp_path):
+    """Test that a retargeted symlink is checked again."""
+    from utils.safety import PathValidator
+
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "inside.py").write_text("x = 1\n")
+    (tmp_path / "outside.py").write_text("secret\n")
+    link = root / "link.py"
+    link.symlink_to(root / "inside.py")
+
+    validator = PathValidator([str(root)])
+    assert validator.is_safe_path(str(link))
+
+    link.unlink()
+    link.symlink_to(tmp_path / "outside.py")
+    assert not validator.is_safe_path(str(link))
+
+
+def test_path_validator_list_safe_files(tmp_path, monkeypatch):
+    """Test listing files with ignored directories pruned."""
+    from utils.safety import PathValidator
+
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("x = 1\n")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD").write_text("ref\n")
+    (tmp_path / "top.txt").write_text("top\n")
+
+    validator = PathValidator([str(tmp_path)])
+    files = validator.list_safe_files(str(tmp_path))
+    assert sorted(files) == [str(tmp_path / "pkg" / "a.py"), str(tmp_path / "top.txt")]
+    assert validator.list_safe_files(str(tmp_path), recursive=False) == [str(tmp_path / "top.txt")]
+    assert len(validator.list_safe_files(str(tmp_path), ignored_dirs=())) == 3
+
+    # An unreadable subdirectory is skipped instead of failing the listing
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if path == str(tmp_path / "pkg"):
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    assert validator.list_safe_files(str(tmp_path)) == [str(tmp_path / "top.txt")]
+
+
+def test_settings_file_filter():
+    """Test ignore patterns and extension filtering."""
+    from config.settings import Settings
+
+    settings = Settings()
+    assert settings.is_file_allowed("src/main.py")
+    assert settings.is_file_allowed("Makefile")
+    assert not settings.is_file_allowed("node_modules/pkg/index.js")
+    assert not settings.is_file_allowed("app/node_modules/pkg/index.js")
+    assert not settings.is_file_allowed("pkg/module.pyc")
+    assert not settings.is_file_allowed("tools/app.exe")
+    assert not settings.is_file_allowed("/home/dev/project/.venv/lib/site.py")
+    assert settings.is_file_allowed("src/build.py")
+    assert not settings.is_file_allowed("build/lib/module.py")
+    assert settings.repositories.is_dir_ignored("app/node_modules", "node_modules")
+    assert not settings.repositories.is_dir_ignored("src/builder", "builder")
+
+
+def test_settings_clear_cache():
+    """Test that edited patterns take effect after clearing the cache."""
+    from config.settings import Settings
+
+    settings = Settings()
+    assert settings.is_file_allowed("notes/todo.md")
+    settings.repositories.ignore_patterns.append("**/notes/**")
+    settings.clear_cache()
+    assert not settings.is_file_allowed("notes/todo.md")
+
+
+def test_ignore_trie():
+    """Test gitignore-style matching in the ignore trie."""
+    from config.ignore import IgnoreTrie
+
+    trie = IgnoreTrie(["**/node_modules/**", "*.pyc", "docs/", "src/*/gen_?.py"])
+    assert trie.matches("a/b/node_modules/x.js")
+    assert trie.matches("pkg/mod.pyc")
+    assert trie.matches("docs/index.md")
+    assert trie.matches("src/core/gen_a.py")
+    assert not trie.matches("src/node_modules.py")
+    assert trie.matches("pkg/docs/index.md")
+    assert not trie.matches("src/core/sub/gen_a.py")
+
+    # A leading or inner "/" anchors the pattern to the root
+    anchored = IgnoreTrie(["/build", "/dist/", "pkg/out/"])
+    assert anchored.matches("build")
+    assert not anchored.matches("pkg/build")
+    assert anchored.matches("dist/a.js")
+    assert not anchored.matches("pkg/dist/a.js")
+    assert anchored.matches("pkg/out/a.js")
+    assert not anchored.matches("src/pkg/out/a.js")
+
+
+def test_file_utils_read_lines(tmp_path):
+    """Test that line ranges are decoded and size-checked like read_text."""
+    import asyncio
+    from config.settings import Settings
+    from core.file_utils import FileUtils
+
+    source = tmp_path / "a.py"
+    source.write_text("one\ntwo\nthree\n")
+    legacy = tmp_path / "notes.txt"
+    legacy.write_bytes("caf\xe9 one\ncaf\xe9 two\n".encode("utf-16"))
+
+    settings = Settings()
+    file_utils = FileUtils(settings)
+    assert asyncio.run(file_utils.read_lines(str(source), 2, 3)) == "two\nthree"
+    assert asyncio.run(file_utils.read_lines(str(legacy), 2, 2)) == "caf\xe9 two"
+
+    settings.server.max_file_size_mb = 0
+    with pytest.raises(ValueError):
+        asyncio.run(FileUtils(settings).read_lines(str(source), 1, 1))
+
+
+def test_file_utils_read_text_cache_skips_large_files(tmp_path):
+    """Test that read_text only caches files up to the size cap."""
+    from config.settings import Settings
+    from core import file_utils as fu
+
+    small, large = tmp_path / "small.py", tmp_path / "large.py"
+    small.write_text("x = 1\n")
+    large.write_text("x = 1\n" * (fu._READ_CACHE_MAX_FILE_SIZE // 6 + 1))
+
+    file_utils = fu.FileUtils(Settings())
+    assert file_utils.read_text(str(large)) == large.read_text()
+    assert file_utils.read_text(str(small)) == small.read_text()
+    assert file_utils._read_cached.cache_info().currsize == 1
+
+
+def test_explainer_detection():
+    """Test keyword-based language, pattern, and risk detection."""
+    import asyncio
+    from core.explainer import CodeExplainer
+
+    explainer = CodeExplainer(None)
+    code = "import os\n\ndef login(password):\n    while True:\n        el.innerHTML = password\n"
+    result = asyncio.run(explainer.explain(code))
+    assert result["language"] == "python"
+    assert "authentication" in result["patterns"]
+    assert "xss" in result["risks"]
+    assert "infinite_loops" in result["risks"]
+
+
+def test_settings_load_from_env(monkeypatch):
+    """Test loading settings from environment variables."""
+    from config.settings import Settings
+
+    monkeypatch.setenv("MCP_SERVER_NAME", "Compass")
+    monkeypatch.setenv("MCP_SERVER_VERSION", "2.0.0")
+    monkeypatch.setenv("REPO_ROOT", "/srv/repo")
+    settings = Settings.load_from_env()
+    assert settings.server.name == "Compass"
+    assert settings.server.version == "2.0.0"
+    assert settings.repositories.roots == ["/srv/repo"]
+
+
+def test_settings_load_from_file(tmp_path):
+    """Test loading settings from YAML, including the unchanged-file reload path."""
+    from config.settings import Settings
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("server:\n  name: Custom\nrepositories:\n  ignore_patterns:\n    - '**/gen/**'\n")
+    first = Settings.load_from_file(str(config_file))
+    second = Settings.load_from_file(str(config_file))
+    for settings in (first, second):
+        assert settings.server.name == "Custom"
+        assert settings.search.default_limit == 50
+        assert not settings.is_file_allowed("src/gen/out.py")
+        assert settings.is_file_allowed("node_modules/pkg/index.js")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_settings_save_keeps_mode(tmp_path):
+    """Test that saving settings keeps the config file's permissions."""
+    import stat
+    from config.settings import Settings
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("{}\n")
+    config_file.chmod(0o644)
+
+    Settings().save_to_file(str(config_file))
+    assert stat.S_IMODE(config_file.stat().st_mode) == 0o644
+    assert Settings.load_from_file(str(config_file)).server.name == "CodeCompass"
+
+def test_search_engine_todos():
+    """Test TODO detection with the combined marker regex."""
+    from config.settings import get_settings
+    from core.search import SearchEngine
+
+    engine = SearchEngine(get_settings())
+    todos = engine._find_todos_in_file("x = 1\n# todo: fix this\n# FIXME later\n", "f.py")
+
+    assert [(t.line, t.type, t.text) for t in todos] == [
+        (2, 'todo', 'fix this'),
+        (3, 'FIXME', 'later'),
+    ]
+    assert [t.line for t in engine._find_todos_in_file("# TODO:\r\n# TODO: x\r\n", "f.py")] == [2]
+
+
+def test_search_regex_independent_of_file_size(tmp_path):
+    """Test that regex results do not change for files searched through mmap."""
+    import asyncio
+    from config.settings import Settings
+    from core.search import SearchEngine
+
+    line = "name = 'café'\n"
+    (tmp_path / "small.py").write_text(line)
+    (tmp_path / "large.py").write_text(line + "# padding\n" * 40000)
+
+    settings = Settings()
+    settings.repositories.roots = [str(tmp_path)]
+    settings.search.use_ripgrep = False
+    engine = SearchEngine(settings)
+
+    results = asyncio.run(engine.search(r"caf\w", regex=True, limit=10))
+    assert sorted((os.path.basename(r.path), r.match) for r in results) == [
+        ("large.py", "café"),
+        ("small.py", "café"),
+    ]
+
+
+def test_search_root_under_ignored_name(tmp_path):
+    """Test that ignore patterns only apply below the search root."""
+    import asyncio
+    from config.settings import Settings
+    from core.file_utils import FileUtils
+    from core.search import SearchEngine
+
+    root = tmp_path / "build" / "proj"
+    (root / "pkg").mkdir(parents=True)
+    (root / "build").mkdir()
+    (root / "pkg" / "a.py").write_text("needle = 1  # TODO: check\n")
+    (root / "build" / "b.py").write_text("needle = 2  # TODO: skip\n")
+
+    settings = Settings()
+    settings.repositories.roots = [str(root)]
+    settings.search.use_ripgrep = False
+    engine = SearchEngine(settings)
+    expected = str(root / "pkg" / "a.py")
+
+    assert [r.path for r in asyncio.run(engine.search("needle"))] == [expected]
+    assert [t.path for t in asyncio.run(engine.find_todos())] == [expected]
+    assert [f["path"] for f in asyncio.run(FileUtils(settings).list_files(str(root)))] == [expected]
+    assert settings.is_file_allowed(expected)
+    assert not settings.is_file_allowed(str(root / "build" / "b.py"))
+
+
+def test_search_stats_batched(tmp_path):
+    """Test that search file selection stats large trees in batches."""
+    from config.settings import Settings
+    from core import file_utils
+    from core.search import SearchEngine
+
+    for i in range(file_utils._STAT_CHUNK_SIZE + 10):
+        (tmp_path / f"m{i:04}.py").write_text("x = 1\n")
+    (tmp_path / "notes.txt").write_text("x\n")
+
+    settings = Settings()
+    settings.repositories.roots = [str(tmp_path)]
+    stats = SearchEngine(settings)._get_search_stats()
+    assert sorted(path for path, _ in stats) == sorted(str(p) for p in tmp_path.glob("*.py"))
+    assert all(stat_info.st_size == 6 for _, stat_info in stats)
+
+def test_search_patterns_compiled_once():
+    """Test that TODO and query patterns are shared rather than recompiled."""
+    from config.settings import get_settings
+    from core.search import SearchEngine, _compile_query
+
+    settings = get_settings()
+    assert SearchEngine(settings)._todo_re is SearchEngine(settings)._todo_re
+    assert _compile_query("foo", False, False) is _compile_query("foo", False, False)
+    assert _compile_query("foo", False, False) is not _compile_query("foo", False, True)
+
+
+def test_trigram_index_candidates(tmp_path):
+    """Test that the trigram index keeps only files that can match."""
+    import os
+    from core.trigram import TrigramIndex
+
+    a, b = tmp_path / "a.py", tmp_path / "b.py"
+    a.write_text("def Handler(): pass\n")
+    b.write_text("x = 1\n")
+    files = [(str(p), os.stat(p)) for p in (a, b)]
+
+    index = TrigramIndex(lambda path: open(path).read())
+    assert index.candidates(files, "handler") == files[:1]
+    assert index.candidates(files, "x") == files
+
+    b.write_text("handler = None\n")
+    files = [(str(p), os.stat(p)) for p in (a, b)]
+    assert index.candidates(files, "HANDLER") == files
+
+    # Files gone from the listing under the scope are evicted
+    b.unlink()
+    files = files[:1]
+    assert index.candidates(files, "handler", [str(tmp_path)]) == files
+    assert sorted(index._files) == [str(a)]
+    assert not index._dead and all(list(ids) == [index._files[str(a)][2]] for ids in index._postings.values())
+
+    # Files past the size cap are never read and always kept
+    capped = TrigramIndex(lambda path: open(path).read(), max_bytes=1)
+    assert capped.candidates(files, "zzz") == files
+    assert not capped._files